@@ -0,0 +1,169 @@
+"""
+End-to-end benchmark of ElchiCommander against the test devices.
+
+For configs of different sizes, every action type is executed in a fresh ElchiCommander process with --timings, once
+with an empty config cache and several times with a warm one. The results are stored as JSON, so that runs before and
+after a change can be compared:
+
+    python -m benchmarks.bench_commander --output before.json
+    python -m benchmarks.bench_commander --output after.json --compare before.json
+"""
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+CONFIG_SIZES = (10, 1000, 50000)
+
+devices = {'oven_1': {'type': 'heater', 'device': 'Test Controller', 'port': 'COMXY'},
+           'temp_sensor_1': {'type': 'temp_sensor', 'device': 'Test Sensor', 'port': 'COMXY'},
+           'gas_ctrl_1': {'type': 'flow_controller', 'device': 'Test MFC', 'port': 'COMXY'},
+           'triggerbox_1': {'type': 'triggerbox', 'device': 'Test Trigger', 'port': 'COMXY'},
+           'multiplexer_1': {'type': 'multiplexer', 'device': 'Test Multiplexer', 'port': 'COMXY'}}
+
+# One action per test device, these are the ones executed. The rest of the config is filled with copies of them.
+benchmark_actions = {
+    'set_temp': {'type': 'set_temp', 'heater': 'oven_1', 'temp_sensor': 'temp_sensor_1', 't_set': 500,
+                 'delta_time': 1, 'delta_temp': 100, 'time_res': 1},
+    'set_temp_blind': {'type': 'set_temp_blind', 'heater': 'oven_1', 't_set': 500},
+    'gas_ctrl': {'type': 'gas_ctrl', 'flow_controller': 'gas_ctrl_1',
+                 'flow_1': 10.0, 'flow_2': 20.0, 'flow_3': 30.0, 'flow_4': 40.0},
+    'trigger': {'type': 'trigger', 'triggerbox': 'triggerbox_1',
+                'state_1': 1, 'state_2': 0, 'state_3': 1, 'state_4': 0},
+    'multiplexer': {'type': 'multiplexer', 'multiplexer': 'multiplexer_1',
+                    **{f'state_L{n}R{m}': int(n == m) for n in range(1, 5) for m in range(1, 5)}},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end benchmark of ElchiCommander using the test devices.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=CONFIG_SIZES,
+                        help='Number of actions in the generated configs.')
+    parser.add_argument('--repeats', type=int, default=3, help='Number of runs with a warm config cache.')
+    parser.add_argument('--output', type=Path, default=Path('bench_results.json'), help='Where to store the results.')
+    parser.add_argument('--compare', type=Path, default=None, help='Earlier results to compare against.')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            config_path = Path(tmp_dir) / f'config_{size}.yaml'
+            write_config(config_path, size)
+            for action_id, action_type in enumerate(benchmark_actions, start=1):
+                cache_path = config_path.with_name(config_path.name + '.cache')
+                cache_path.unlink(missing_ok=True)
+                results.append({'actions': size, 'action': action_type, 'cache': 'cold',
+                                **run_commander(config_path, action_id)})
+                warm = [run_commander(config_path, action_id) for _ in range(args.repeats)]
+                results.append({'actions': size, 'action': action_type, 'cache': 'warm',
+                                **{key: statistics.median(run[key] for run in warm) for key in warm[0]}})
+                print_result(results[-2])
+                print_result(results[-1])
+
+    report = {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+              'commit': _git_commit(),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'results': results}
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.compare is not None:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            compare(json.load(file), report)
+
+
+def write_config(config_path: Path, size: int) -> None:
+    """Write a config with the benchmark actions as ids 1 to 5, filled up with copies of them to size actions"""
+    templates = list(benchmark_actions.values())
+    actions = {action_id: dict(templates[(action_id - 1) % len(templates)]) for action_id in range(1, size + 1)}
+    with open(config_path, 'w', encoding='utf-8') as file:
+        yaml.dump({'devices': devices, 'actions': actions}, file, default_flow_style=False, default_style='')
+
+
+def run_commander(config_path: Path, action_id: int) -> dict:
+    """
+    Execute one action in a fresh ElchiCommander process and return the timings in seconds:
+    cold_start: Time from launching the process until it prints that it is done, i.e. before the exit countdown
+    load_validate: Loading the config and validating the devices and the action
+    connect: Connecting all devices
+    first_command: Time from process start to the first command sent to a device
+    """
+    start = time.perf_counter()
+    cold_start = None
+    # Unbuffered, so that the done line arrives when it is printed and not only when the process exits
+    with subprocess.Popen([sys.executable, '-u', '-m', 'src.elchi_commander', str(action_id),
+                           '--config', str(config_path), '--timings'],
+                          cwd=REPO_DIR, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True) as process:
+        lines = []
+        for line in process.stdout:
+            if cold_start is None and line.startswith('Done, exiting'):
+                cold_start = time.perf_counter() - start
+            lines.append(line)
+    output = ''.join(lines)
+    if process.returncode != 0 or cold_start is None:
+        raise RuntimeError(f'ElchiCommander failed for action {action_id}:\n{output}')
+
+    phases = parse_timings(output)
+    return {'cold_start': cold_start,
+            'import': phases['import'][1],
+            'load_validate': phases['load_config'][1] + phases['validate_actions'][1],
+            'connect': phases['connect'][1],
+            'first_command': phases['device_io'][0] if 'device_io' in phases else float('nan')}
+
+
+def parse_timings(output: str) -> dict:
+    """Parse the table printed by --timings into {phase: (start, total)}"""
+    lines = output.splitlines()
+    table_start = max(i for i, line in enumerate(lines) if line.startswith('Phase '))
+    phases = {}
+    for line in lines[table_start + 1:]:
+        if line.startswith('Wall time'):
+            break
+        name, start, _calls, total = line.rsplit(maxsplit=3)
+        phases[name.strip()] = (float(start), float(total))
+    return phases
+
+
+def print_result(result: dict) -> None:
+    print(f'{result["actions"]:>6d} actions, {result["action"]:<15} {result["cache"]:<5} cache: '
+          + ', '.join(f'{key} {result[key] * 1000:8.1f} ms' for key in ('cold_start', 'import', 'load_validate',
+                                                                         'connect', 'first_command')))
+
+
+def compare(old: dict, new: dict) -> None:
+    print(f'Comparing with {old["commit"]} from {old["timestamp"]}:')
+    old_results = {(r['actions'], r['action'], r['cache']): r for r in old['results']}
+    for result in new['results']:
+        if (before := old_results.get((result['actions'], result['action'], result['cache']))) is None:
+            continue
+        changes = ', '.join(f'{key} {_relative_change(before[key], result[key]):+6.1f} %'
+                            for key in ('cold_start', 'load_validate', 'connect', 'first_command'))
+        print(f'{result["actions"]:>6d} actions, {result["action"]:<15} {result["cache"]:<5} cache: {changes}')
+
+
+def _relative_change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else float('nan')
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True).stdout.strip()
+    except OSError:
+        return 'unknown'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark of the config validation (validate_config, as used by --validate and ElchiCreator's schema).
+
+Generated configs with the benchmark actions of bench_commander are validated in process, once as written and once
+with every tenth action broken, which checks that all errors are collected in a single pass:
+
+    python -m benchmarks.bench_validate --output before.json
+    python -m benchmarks.bench_validate --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+
+from benchmarks.bench_commander import benchmark_actions, devices, _git_commit, _relative_change
+from src.helpers.errors import ConfigError
+from src.helpers.validate import validate_config
+
+CONFIG_SIZES = (1000, 10000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the config validation.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=CONFIG_SIZES,
+                        help='Number of actions in the generated configs.')
+    parser.add_argument('--repeats', type=int, default=5, help='Number of validations per config.')
+    parser.add_argument('--output', type=Path, default=Path('bench_validate.json'), help='Where to store the results.')
+    parser.add_argument('--compare', type=Path, default=None, help='Earlier results to compare against.')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        for broken in (False, True):
+            config = make_config(size, broken)
+            runs = [validate(config) for _ in range(args.repeats)]
+            results.append({'actions': size, 'broken': broken, 'errors': runs[0][1],
+                            'validate': statistics.median(run[0] for run in runs)})
+            print(f'{size:>6d} actions, {'broken' if broken else 'valid':<6}: {results[-1]['validate'] * 1000:8.1f} ms,'
+                  f' {results[-1]['errors']} errors')
+
+    report = {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+              'commit': _git_commit(),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'results': results}
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.compare is not None:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            old = json.load(file)
+        print(f'Comparing with {old["commit"]} from {old["timestamp"]}:')
+        old_results = {(r['actions'], r['broken']): r for r in old['results']}
+        for result in results:
+            if (before := old_results.get((result['actions'], result['broken']))) is not None:
+                print(f'{result["actions"]:>6d} actions, {'broken' if result['broken'] else 'valid':<6}:'
+                      f' {_relative_change(before['validate'], result['validate']):+6.1f} %')
+
+
+def make_config(size: int, broken: bool) -> dict:
+    """A config of size copies of the benchmark actions, if broken every tenth one has a value out of bounds"""
+    templates = list(benchmark_actions.values())
+    actions = {action_id: dict(templates[(action_id - 1) % len(templates)]) for action_id in range(1, size + 1)}
+    if broken:
+        for action_id in range(10, size + 1, 10):
+            actions[action_id]['t_set' if 'heater' in actions[action_id] else 'type'] = 1E9
+    return {'devices': devices, 'actions': actions}
+
+
+def validate(config: dict) -> tuple[float, int]:
+    """Validate the config and return the time taken in seconds and the number of errors found"""
+    errors = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            validate_config(config)
+        except ConfigError as e:
+            errors = str(e).count('\n') if '\n' in str(e) else 1
+    return time.perf_counter() - start, errors
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,9 @@ elchi_commander_a = Analysis(
     pathex=['.'],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # Drivers are imported lazily by name (see src/helpers/devices.py), so PyInstaller can not find them by itself
+    hiddenimports=['src.drivers.Aera', 'src.drivers.ElchWorks', 'src.drivers.Eurotherms', 'src.drivers.Jumo',
+                   'src.drivers.Keithly', 'src.drivers.Omega', 'src.drivers.Pyrometer', 'src.drivers.TestDevices'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -69,6 +71,39 @@ elchi_creator_exe = EXE(
     entitlements_file=None,
 )
 
+# ----- Elchi Client -----
+elchi_client_a = Analysis(
+    ['src\\elchi_client.py'],
+    pathex=['.'],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    noarchive=False,
+    optimize=0,
+)
+elchi_client_pyz = PYZ(elchi_client_a.pure)
+
+elchi_client_exe = EXE(
+    elchi_client_pyz,
+    elchi_client_a.scripts,
+    exclude_binaries=True,
+    name='Elchi Client',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+
 # ----- Shared output folder -----
 coll = COLLECT(
     elchi_commander_exe,
@@ -77,6 +112,9 @@ coll = COLLECT(
     elchi_creator_exe,
     elchi_creator_a.binaries,
     elchi_creator_a.datas,
+    elchi_client_exe,
+    elchi_client_a.binaries,
+    elchi_client_a.datas,
     strip=False,
     upx=True,
     upx_exclude=[],
@@ -1,4 +1,5 @@
 import abc
+import time
 
 
 class AbstractValveController(abc.ABC):
@@ -237,3 +238,23 @@ class AbstractSensor:
         """Close the serial port"""
         raise NotImplementedError('Operation {:s} not supported for {:s} yet!'.format('close',
                                                                                       self.__class__.__name__))
+
+
+def wait_until_ready(probe, max_wait: float, interval: float = 0.05) -> bool:
+    """
+    Replaces a fixed sleep after opening a port: Some devices restart when their port is opened and ignore commands
+    until they are ready. Instead of always waiting the worst case, call probe (a cheap identification or register read)
+    until it returns True without raising, for at most max_wait seconds (the worst-case start-up time of the device).
+    Returns False if the device did not answer in time, the caller then proceeds as it did after the fixed sleep.
+    """
+    deadline = time.monotonic() + max_wait
+    while True:
+        try:
+            if probe():
+                return True
+        except Exception:
+            # Any error just means the device is not ready yet
+            pass
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
@@ -1,5 +1,4 @@
 import threading
-import time
 
 import minimalmodbus
 import serial
@@ -64,7 +63,15 @@ class Omniplex(minimalmodbus.Instrument):
         super().__init__(portname, slaveadress)
         self.serial.baudrate = baudrate
         self.lock = threading.Lock()
-        time.sleep(2)
+        Base.wait_until_ready(self._probe_ready, max_wait=2)
+
+    def _probe_ready(self) -> bool:
+        timeout, self.serial.timeout = self.serial.timeout, 0.1
+        try:
+            self.read_bit(0, functioncode=1)
+            return True
+        finally:
+            self.serial.timeout = timeout
 
     def set_single_relay(self, relay: tuple, state: bool) -> None:
         with self.lock:
@@ -99,7 +106,8 @@ class Thermolino(Base.AbstractSensor, serial.Serial):
     def __init__(self, port):
         super().__init__(port, timeout=1.5)
         self.com_lock = threading.Lock()
-        time.sleep(1)
+        Base.wait_until_ready(lambda: _probe_reading(self), max_wait=1)
+        self.reset_input_buffer()
         with self.com_lock:
             self.write(":FUNC 'TEMP'\n".encode())
 
@@ -119,7 +127,8 @@ class Thermoplatino(Base.AbstractSensor, serial.Serial):
     def __init__(self, port):
         super().__init__(port, timeout=1.5, baudrate=115200)
         self.com_lock = threading.Lock()
-        time.sleep(1)
+        Base.wait_until_ready(lambda: _probe_reading(self), max_wait=1)
+        self.reset_input_buffer()
         with self.com_lock:
             self.write(":FUNC 'TEMP'\n".encode())
 
@@ -142,9 +151,17 @@ class ElchLaser(Base.AbstractController, minimalmodbus.Instrument):
 
     def __init__(self, portname, slaveadress=1, baudrate=9600):
         super().__init__(portname, slaveadress)
-        time.sleep(1)
         self.serial.baudrate = baudrate
         self.com_lock = threading.Lock()
+        Base.wait_until_ready(self._probe_ready, max_wait=1)
+
+    def _probe_ready(self) -> bool:
+        timeout, self.serial.timeout = self.serial.timeout, 0.1
+        try:
+            self.read_register(0, number_of_decimals=1)
+            return True
+        finally:
+            self.serial.timeout = timeout
 
     def get_process_variable(self):
         """Return the current process variable"""
@@ -251,3 +268,15 @@ class ElchLaser(Base.AbstractController, minimalmodbus.Instrument):
     def disable_aiming_beam(self):
         with self.com_lock:
             self.write_register(13, 0)
+
+
+def _probe_reading(device: serial.Serial) -> bool:
+    """Readiness probe for the Thermolino and Thermoplatino, request a reading and check that a number comes back"""
+    timeout, device.timeout = device.timeout, 0.25
+    try:
+        device.reset_input_buffer()
+        device.write(':read?\n'.encode())
+        float(device.readline().decode())
+        return True
+    finally:
+        device.timeout = timeout
@@ -1,5 +1,4 @@
 import threading
-import time
 
 import serial
 
@@ -12,9 +11,20 @@ class Keithly2000(Base.AbstractSensor, serial.Serial):
     def __init__(self, port):
         super().__init__(port, timeout=1.5)
         self.com_lock = threading.Lock()
-        time.sleep(1)
+        # Wait until the instrument answers an identification query (at most 1 s)
+        Base.wait_until_ready(self._probe_ready, max_wait=1)
+        self.reset_input_buffer()
         self.write('*RST\n'.encode())
 
+    def _probe_ready(self) -> bool:
+        timeout, self.timeout = self.timeout, 0.1
+        try:
+            self.reset_input_buffer()
+            self.write('*IDN?\n'.encode())
+            return bool(self.readline().strip())
+        finally:
+            self.timeout = timeout
+
     def close(self):
         serial.Serial.close(self)
 
@@ -0,0 +1,36 @@
+import argparse
+import sys
+from argparse import ArgumentError
+
+from src.helpers.exit import delayed_exit
+from src.helpers.ipc import request_action, request_stop
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='ElchiClient hands actions to a running ElchiCommander server'
+                                                 ' (started with ElchiCommander --serve) and waits for them to finish!',
+                                     exit_on_error=False)
+    parser.add_argument('action_id', type=int, nargs='?',
+                        help='The action to execute. Actions are defined in the config file.')
+    parser.add_argument('--stop', action='store_true', help='Shut the server down and close all devices.')
+
+    try:
+        args = parser.parse_args()
+    except ArgumentError as e:
+        delayed_exit(f'Invalid command line arguments, {e}')
+    else:
+        if not args.stop and (args.action_id is None or args.action_id < 0):
+            delayed_exit('Invalid action id! Valid action ids are positive integers!')
+
+        try:
+            if args.stop:
+                return request_stop()
+            else:
+                print(f'Requesting action {args.action_id} from ElchiCommander server...')
+                return request_action(args.action_id)
+        except ConnectionError as e:
+            delayed_exit(f'{e} Start it with ElchiCommander --serve first!', 1)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
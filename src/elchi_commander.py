@@ -1,15 +1,22 @@
+import time
+
+# Taken before all other imports, so that --timings can report how long importing takes
+_process_start = time.perf_counter()
+
 import argparse
 import traceback
 from argparse import ArgumentError
 from pathlib import Path
 
-from platformdirs import user_config_dir
-
-from src.helpers.execute_action import execute_action
+from src.helpers.errors import ElchiError
 from src.helpers.exit import delayed_exit, report_success
-from src.helpers.file_load import load_config
+from src.helpers.file_load import default_config_path
 from src.helpers.logging import log_message
-from src.helpers.validate import validate_config
+from src.helpers.sequence import step_hook
+from src.helpers.session import Session
+from src.helpers.timings import enable_timings, record_phase, report_timings
+
+_imports_done = time.perf_counter()
 
 
 def main() -> None:
@@ -18,35 +25,89 @@ def main() -> None:
     parser = argparse.ArgumentParser(description='ElchiCommander is a CLI application for experiment control!'
                                                  ' It can execute actions defined in a configuration file!',
                                      exit_on_error=False)
-    parser.add_argument('action_id', type=int, help='The action to execute. Actions are defined in the config file.')
+    parser.add_argument('action_id', type=int, nargs='?',
+                        help='The action to execute. Actions are defined in the config file.')
+    parser.add_argument('--serve', action='store_true',
+                        help='Run as a resident server that keeps devices connected. Actions are then requested'
+                             ' with ElchiClient.')
+    parser.add_argument('--validate', action='store_true',
+                        help='Validate the whole config file, including all actions, without executing anything.'
+                             ' Otherwise, only the requested action is validated.')
+    parser.add_argument('--config', type=Path, default=None,
+                        help='Use this config file instead of the one in the user config directory.')
+    parser.add_argument('--run-sequence', action='store_true',
+                        help='Execute all remaining actions of the iterate_list action action_id in this process,'
+                             ' keeping the devices connected between them.')
+    parser.add_argument('--step-command', type=str, default=None,
+                        help='With --run-sequence: Shell command executed after every action (e.g. to start the'
+                             ' measurement), the next action starts once it finished.')
+    parser.add_argument('--step-wait', type=float, default=0,
+                        help='With --run-sequence: Seconds to wait after every action (e.g. for the measurement).')
+    parser.add_argument('--timings', action='store_true',
+                        help='Print how long each phase of the execution took and append it to the log.')
 
     try:
         args = parser.parse_args()
     except ArgumentError as e:
         delayed_exit(f'Invalid command line arguments, {e}')
     else:
-        if args.action_id < 0:
+        if not args.run_sequence and (args.step_command is not None or args.step_wait):
+            delayed_exit('Invalid command line arguments, --step-command and --step-wait require --run-sequence')
+        if args.timings:
+            enable_timings(_process_start)
+            record_phase('import', _process_start, _imports_done)
+
+        if args.serve:
+            log_message('Server mode requested!')
+            print('Server mode requested!')
+        elif args.validate:
+            log_message('Config validation requested!')
+            print('Config validation requested!')
+        elif args.action_id is None:
+            delayed_exit('No action id given! Pass an action id, --validate or --serve!')
+        elif args.action_id < 0:
             delayed_exit('Invalid action id! Valid action ids are positive integers!')
+        elif args.run_sequence:
+            log_message(f'Sequence of action {args.action_id} requested!')
+            print(f'Sequence of action {args.action_id} requested!')
         else:
             log_message(f'Action {args.action_id} requested!')
             print(f'Action {args.action_id} requested!')
 
-        config_dir = Path(user_config_dir('ElchiCommander', 'ElchWorks', roaming=True))
-        config_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            if args.serve:
+                # Imported here, so that the normal one-shot execution does not pay for it
+                from src.helpers.server import serve
+                serve(args.config or default_config_path())
+                return
 
-        config = load_config(config_dir / 'config.yaml')
-        validate_config(config)
-        log_message('Config loaded and validated successfully!')
-
-        execute_action(args.action_id, config)
+            try:
+                with Session(args.config or default_config_path(), interactive=True,
+                             look_ahead=args.run_sequence) as session:
+                    if args.validate:
+                        session.validate()
+                        log_message('Config validated successfully!')
+                        return
+                    if args.run_sequence:
+                        session.run_sequence(args.action_id, step_hook(args.step_command, args.step_wait))
+                    else:
+                        session.run(args.action_id)
+            finally:
+                # Before the exit countdown or error prompt, so that failed runs are reported as well
+                report_timings()
+        except ElchiError as e:
+            delayed_exit(str(e), e.error_code)
+        log_message(f'Action executed successfully!')
 
 
 if __name__ == "__main__":
     try:
         main()
+        log_message(f'ElchiCommander finished!')
+    except ElchiError as ex:
+        # E.g. the log could not be written outside of an action
+        delayed_exit(str(ex), ex.error_code)
     except Exception as ex:
         delayed_exit(f'An unexpected error occurred: {ex}\n Traceback: {traceback.format_exc()}')
     else:
-        log_message(f'Action executed successfully!')
-        log_message(f'ElchiCommander finished!')
         report_success()
@@ -1,19 +1,24 @@
 import datetime
+import itertools
 import os
+from collections import Counter
 from pathlib import Path
+from typing import Iterator
 
-import serial.tools.list_ports
-import yaml
 from platformdirs import user_config_dir
 
+from src.helpers.config_writer import write_config
 from src.helpers.cycles import Cycle, TemperatureCycle, BlindTemperatureCycle, FlowCycle, TriggerCycle, \
-    MultiplexerCycle, RepCycle, flatten
+    MultiplexerCycle, RepCycle, GridCycle
 from src.helpers.devices import devices as valid_devices
+from src.helpers.ports import available_ports
+from src.helpers.progress import progress_path
+from src.helpers.schema import action_schemas, check_action
 from src.helpers.queries import (query_yes_no, query_options, query_unique, query_bounded, query_bounded_int,
                                  query_bounded_list, query_options_list)
 
-available_ports = [port.device for port in serial.tools.list_ports.comports()]
-cycle_types = ['Temperature', 'Temperature (sensorless)', 'Flow', 'Trigger', 'Multiplexer', 'Repetition']
+SHARD_SIZE = 10000
+cycle_types = ['Temperature', 'Temperature (sensorless)', 'Flow', 'Trigger', 'Multiplexer', 'Repetition', 'Grid']
 
 devices = {}
 cycles = []
@@ -35,17 +40,24 @@ def main():
         if cycle := add_cycle():
             cycles.append(cycle)
 
-    actions = [cycle.unroll() for cycle in cycles]
-    actions = list(flatten(actions))
-    actions = {key: action for key, action in enumerate(actions, start=1)}
-
-    actions.update({0: {'type': 'iterate_list', 'processed_actions': [],
-                        'action_ids': sorted(list(actions.keys()))}})
-
-    config = {'devices': devices, 'actions': actions}
-
-    print('Done! Here is the configuration file I created for you:')
-    print(yaml.dump(config, default_flow_style=False, default_style=''))
+    # The actions are only counted and checked here and unrolled again while writing, so they are never held in
+    # memory together. The same schema as in ElchiCommander is used, so a written config always passes validation.
+    action_types = Counter()
+    errors = []
+    for action_id, action in enumerate(unroll_all(cycles), start=1):
+        action_types[action['type']] += 1
+        errors.extend(f'Action {action_id}: {error}' for error in check_action(action, devices))
+    action_count = action_types.total()
+    if errors:
+        print(f'Sorry, {len(errors)} problems were found in the actions of your cycles:')
+        print('\n'.join(errors[:10]) + ('\n...' if len(errors) > 10 else ''))
+        return
+
+    print('Done! Here is a summary of the configuration file I created for you:')
+    print(f'{len(devices)} devices: {', '.join(devices)}')
+    print(f'{action_count} actions: '
+          f'{', '.join(f'{count} {action_type}' for action_type, count in action_types.items())}')
+    print(f'Action 0 iterates over all {action_count} actions.')
 
     if query_yes_no('Do you want to save this for use with ElchiCommander?'):
         config_path = Path(user_config_dir('ElchiCommander',
@@ -58,14 +70,27 @@ def main():
             timestamp = datetime.datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
             base, ext = os.path.splitext(config_path)
             os.rename(config_path, f'{base}_{timestamp}{ext}')
+            # The progress of the old list action belongs to the old config
+            if os.path.isfile(journal_path := progress_path(config_path)):
+                os.rename(journal_path, f'{base}_{timestamp}{ext}.progress')
 
-        with open(config_path, "w", encoding="utf-8") as f:
-            yaml.dump(config, f, default_flow_style=False, default_style='')
+        list_action = {'type': 'iterate_list', 'processed_actions': [], 'action_ids': range(1, action_count + 1)}
+        # Large experiments are split into include files, so that ElchiCommander only has to parse the actions it uses
+        shard_size = SHARD_SIZE if action_count > SHARD_SIZE else None
+        write_config(config_path, devices, itertools.chain([(0, list_action)], enumerate(unroll_all(cycles), start=1)),
+                     shard_size, shard_stem=f'actions_{datetime.datetime.now().strftime("%Y-%m-%dT%H-%M-%S")}')
+        print(f'Configuration file written to {config_path}!')
 
 
-def add_cycle() -> Cycle | None:
+def unroll_all(cycles: list[Cycle]) -> Iterator[dict]:
+    return itertools.chain.from_iterable(cycle.unroll() for cycle in cycles)
+
+
+def add_cycle(grid_axis: bool = False) -> Cycle | None:
+    """Ask for a cycle and its subcycles, or if grid_axis is set, for a simple cycle used as axis of a grid"""
     cycle = None
-    match query_options('What type of cycle do you want to add?', cycle_types):
+    options = [cycle_type for cycle_type in cycle_types if cycle_type != 'Grid'] if grid_axis else cycle_types
+    match query_options('What type of cycle do you want to add?', options):
         case 'Temperature':
             edit_stack.append('Temperature')
             heater = query_options('Which heater do you want to use?',
@@ -77,15 +102,16 @@ def add_cycle() -> Cycle | None:
                                     device['type'] == 'temp_sensor'])
             if sensor is None:
                 return None
+            limits = action_schemas['set_temp'].values
             delta_temp = query_bounded('What is the maximum temperature change in degree Celsius that is still'
                                        ' regarded stable?',
-                                       0.01, 100)
+                                       *limits['delta_temp'])
             delta_time = query_bounded('For how many seconds should the temperature change by less than that?',
-                                       1, 1000000)
-            time_res = query_bounded_int('How many seconds should pass between temperature checks?', 1,
-                                         1000000)
-            t_start = query_bounded_int('What is the start temperature in degree Celsius?', 0, 1500)
-            t_end = query_bounded_int('What is the end temperature in degree Celsius?', 0, 1500)
+                                       *limits['delta_time'])
+            time_res = query_bounded_int('How many seconds should pass between temperature checks?',
+                                         *limits['time_res'])
+            t_start = query_bounded_int('What is the start temperature in degree Celsius?', *limits['t_set'])
+            t_end = query_bounded_int('What is the end temperature in degree Celsius?', *limits['t_set'])
             t_step = query_bounded_int('What is the temperature step in degree Celsius?', 1, 1000)
             cycle = TemperatureCycle(t_start, t_end, t_step, heater, sensor, delta_time, delta_temp, time_res)
         case 'Temperature (sensorless)':
@@ -94,8 +120,9 @@ def add_cycle() -> Cycle | None:
                                    [device_id for device_id, device in devices.items() if device['type'] == 'heater'])
             if heater is None:
                 return None
-            t_start = query_bounded_int('What is the start temperature in degree Celsius?', 0, 1500)
-            t_end = query_bounded_int('What is the end temperature in degree Celsius?', 0, 1500)
+            limits = action_schemas['set_temp_blind'].values
+            t_start = query_bounded_int('What is the start temperature in degree Celsius?', *limits['t_set'])
+            t_end = query_bounded_int('What is the end temperature in degree Celsius?', *limits['t_set'])
             t_step = query_bounded_int('What is the temperature step in degree Celsius?', 1, 1000)
             cycle = BlindTemperatureCycle(t_start, t_end, t_step, heater)
         case 'Flow':
@@ -108,7 +135,7 @@ def add_cycle() -> Cycle | None:
             flows = []
             while query_yes_no('Do you want to add a set of flow rates?'):
                 flows.append(query_bounded_list('What are the flow percentages for channels 1 to 4?',
-                                                0.0, 100, 4))
+                                                *action_schemas['gas_ctrl'].channels.values, 4))
             cycle = FlowCycle(flow_controller, flows)
         case 'Trigger':
             edit_stack.append('Trigger')
@@ -140,13 +167,26 @@ def add_cycle() -> Cycle | None:
             reps = query_bounded_int('How many repetition spectra do you want to record?',
                                      1, 1000000)
             delay = query_bounded_int('How many seconds should pass between spectra?',
-                                      1, 1000000)
+                                      *action_schemas['wait'].values['wait_time'])
             cycle = RepCycle(delay, reps)
+        case 'Grid':
+            edit_stack.append('Grid')
+            axes = []
+            while query_yes_no('You are here: ' + ' --> '.join(edit_stack) + '\nDo you want to add an axis to the grid?'
+                               ' (The first axis is the outermost one)'):
+                if axis := add_cycle(grid_axis=True):
+                    axes.append(axis)
+            if not axes:
+                edit_stack.pop()
+                return None
+            serpentine = query_yes_no('Do you want to use serpentine ordering? (Inner axes reverse their direction'
+                                      ' instead of starting over, so every step only changes one axis by one value)')
+            cycle = GridCycle(axes, serpentine)
         case _:
             raise ValueError('Invalid cycle type!')
             # Default case should never be reached
 
-    while query_yes_no(
+    while not grid_axis and query_yes_no(
             'You are here: ' + ' --> '.join(edit_stack) + '\nDo you want to ad a subcycle to this cycle?'):
         if sub_cycle := add_cycle():
             cycle.add_subcycle(sub_cycle)
@@ -161,7 +201,7 @@ def add_device() -> dict | None:
             device = query_options(f'What type of {device_type} do you want to use?', valid_devices[device_type])
             if device is None:
                 return None
-            port = query_options('What port is it connected to?', available_ports)
+            port = query_options('What port is it connected to?', list(available_ports()))
             if port is None:
                 return None
             device_id = query_unique(f'Choose a unique name for this {device_type}: ', list(devices.keys()))
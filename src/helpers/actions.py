@@ -0,0 +1,336 @@
+import math
+import time
+
+from src.helpers.device_pool import DevicePool
+from src.helpers.devices import communication_errors
+from src.helpers.errors import ConfigError, DeviceCommunicationError
+from src.helpers.logging import log_actual_temeprature, log_message
+from src.helpers.scheduler import DeadlineScheduler
+from src.helpers.timings import timed, record_phase
+
+# Longest sleep between two checks of the working setpoint while waiting for a ramp, in seconds
+RAMP_CHECK_INTERVAL = 60
+
+
+class Action:
+    """
+    An action compiled from its (validated) config dict: entries are stored in slots, channel numbers are parsed once
+    and execute is called directly instead of matching on the type string.
+    Meta actions (iterate_list, sweep) are not compiled, see execute_action.
+    """
+    __slots__ = ()
+
+    def device_ids(self) -> dict:
+        """The devices used by the action as {device type: device id}"""
+        return {}
+
+    def describe(self) -> str:
+        """Description of the action for the log file"""
+        raise NotImplementedError
+
+    def execute(self, pool: DevicePool) -> None | float:
+        """Execute the action using the devices of the pool and return its result"""
+        raise NotImplementedError
+
+
+class GasControlAction(Action):
+    __slots__ = ('flow_controller', 'flows')
+
+    def __init__(self, config: dict):
+        self.flow_controller = config['flow_controller']
+        # (channel, flow in %) for the channels given, e.g. flow_2 -> channel 2
+        self.flows = tuple((int(key.removeprefix('flow_')), value) for key, value in config.items()
+                           if key.startswith('flow_') and key != 'flow_controller')
+
+    def device_ids(self) -> dict:
+        return {'flow_controller': self.flow_controller}
+
+    def describe(self) -> str:
+        return (f'Setting flow controller {self.flow_controller} to: '
+                + ', '.join(f'flow_{channel}: {value}' for channel, value in self.flows))
+
+    def execute(self, pool: DevicePool) -> None:
+        device = pool.get(self.device_ids(), 'flow_controller')
+        for channel, value in self.flows:
+            try:
+                with timed('device_io'):
+                    device.set_flow(channel, value)
+            except communication_errors() as e:
+                raise DeviceCommunicationError(f'Communication error when setting flow on channel flow_{channel}:'
+                                               f' {e}') from e
+            else:
+                print(f'Set channel {channel} to {value} %')
+
+
+class TriggerAction(Action):
+    __slots__ = ('triggerbox', 'states')
+
+    def __init__(self, config: dict):
+        self.triggerbox = config['triggerbox']
+        # (channel, state), e.g. state_3 -> channel 3
+        self.states = tuple((int(key.removeprefix('state_')), value) for key, value in config.items()
+                            if key.startswith('state_'))
+
+    def device_ids(self) -> dict:
+        return {'triggerbox': self.triggerbox}
+
+    def describe(self) -> str:
+        return (f'Setting triggerbox {self.triggerbox} to: '
+                + ', '.join(f'state_{channel}: {value}' for channel, value in self.states))
+
+    def execute(self, pool: DevicePool) -> None:
+        device = pool.get(self.device_ids(), 'triggerbox')
+        for channel, value in self.states:
+            try:
+                with timed('device_io'):
+                    device.switch_valve(channel, value)
+            except communication_errors() as e:
+                raise DeviceCommunicationError(f'Communication error when setting flow on channel state_{channel}:'
+                                               f' {e}') from e
+            else:
+                print(f'Set channel {channel} to {value}')
+
+
+class MultiplexerAction(Action):
+    __slots__ = ('multiplexer', 'relays')
+
+    def __init__(self, config: dict):
+        self.multiplexer = config['multiplexer']
+        # ((n, m), state), e.g. state_L2R3 -> (2, 3)
+        self.relays = tuple(((int(key[7]), int(key[9])), value) for key, value in config.items()
+                            if key.startswith('state_L'))
+
+    def device_ids(self) -> dict:
+        return {'multiplexer': self.multiplexer}
+
+    def describe(self) -> str:
+        return (f'Setting multiplexer {self.multiplexer} to: '
+                + ', '.join(f'state_L{n}R{m}: {value}' for (n, m), value in self.relays))
+
+    def execute(self, pool: DevicePool) -> None:
+        device = pool.get(self.device_ids(), 'multiplexer')
+        for (n, m), value in self.relays:
+            try:
+                with timed('device_io'):
+                    device.set_single_relay((n, m), value)
+            except communication_errors() as e:
+                raise DeviceCommunicationError(f'Communication error when switching relay state_L{n}R{m}: {e}') from e
+            else:
+                print(f'Set relay L{n}R{m} to {value}')
+
+
+class BlindTemperatureAction(Action):
+    __slots__ = ('heater', 't_set')
+
+    def __init__(self, config: dict):
+        self.heater = config['heater']
+        self.t_set = config['t_set']
+
+    def device_ids(self) -> dict:
+        return {'heater': self.heater}
+
+    def describe(self) -> str:
+        return f'Setting temeprature of {self.heater} to {self.t_set}!'
+
+    def execute(self, pool: DevicePool) -> None:
+        device = pool.get(self.device_ids(), 'heater')
+        try:
+            with timed('device_io'):
+                device.set_target_setpoint(self.t_set)
+        except communication_errors() as e:
+            raise DeviceCommunicationError(f'Communication error when setting target temperature: {e}') from e
+
+
+class TemperatureAction(Action):
+    __slots__ = ('heater', 'temp_sensor', 't_set', 'delta_time', 'delta_temp', 'time_res', 'time_res_max',
+                 'stability', 'rate', 'wait_for_ramp')
+
+    def __init__(self, config: dict):
+        self.heater = config['heater']
+        self.temp_sensor = config['temp_sensor']
+        self.t_set = config['t_set']
+        self.delta_time = config['delta_time']
+        self.delta_temp = config['delta_temp']
+        self.time_res = config['time_res']
+        # Without time_res_max, the sensor is read every time_res seconds
+        self.time_res_max = config.get('time_res_max', self.time_res)
+        self.stability = config.get('stability', 'reset')
+        # Ramp rate of the heater's working setpoint in °C/min, None keeps the rate set on the controller
+        self.rate = config.get('rate')
+        self.wait_for_ramp = config.get('wait_for_ramp', False)
+
+    def device_ids(self) -> dict:
+        return {'heater': self.heater, 'temp_sensor': self.temp_sensor}
+
+    def describe(self) -> str:
+        return (f'Setting temeprature of {self.heater} to {self.t_set} and wait until the temperature of'
+                f' {self.temp_sensor} changes by less than {self.delta_temp} for {self.delta_time} seconds!')
+
+    def execute(self, pool: DevicePool) -> float:
+        heater, sensor = pool.get_many(self.device_ids(), 'heater', 'temp_sensor')
+
+        if self.rate is not None:
+            # Set before the setpoint, so that the ramp to the new setpoint already uses it
+            try:
+                with timed('device_io'):
+                    heater.set_rate(self.rate)
+            except NotImplementedError as e:
+                raise ConfigError(f'Heater {self.heater} does not support setting a rate!') from e
+            except communication_errors() as e:
+                raise DeviceCommunicationError(f'Communication error when setting the rate: {e}') from e
+            else:
+                print(f'Rate set to {self.rate} °C/min!')
+
+        try:
+            with timed('device_io'):
+                heater.set_target_setpoint(self.t_set)
+        except communication_errors() as e:
+            raise DeviceCommunicationError(f'Communication error when setting target temperature: {e}') from e
+        else:
+            print(f'Temperature set to {self.t_set}!')
+
+        if self.wait_for_ramp:
+            ramp_start = time.perf_counter()
+            self._wait_for_ramp(heater)
+            record_phase('ramp', ramp_start)
+
+        delta_time = self.delta_time
+        delta_temp = self.delta_temp
+        time_res = self.time_res
+
+        print('Waiting for temperature to stabilize!')
+        if self.time_res_max > time_res:
+            print(f'Checking temperature every {time_res} to {self.time_res_max} seconds!')
+        else:
+            print(f'Checking temperature every {time_res} seconds!')
+        print(f'Waiting until the temperature changes by less than {delta_temp} °C over {delta_time} seconds!'
+              f' (stability criterion: {self.stability})')
+
+        try:
+            with timed('device_io'):
+                sensor_temp = sensor.get_sensor_value()
+        except communication_errors() as e:
+            raise DeviceCommunicationError(f'Communication error when reading temperature: {e}') from e
+        else:
+            stabilization_start = time.perf_counter()
+            # Imported here, so that NumPy is only loaded by actions waiting for the temperature
+            from src.helpers.stability import stability_detectors
+
+            # Sleep until each reading is due, the detector judges the readings by the time they were actually taken
+            scheduler = DeadlineScheduler(time_res)
+            detector = stability_detectors[self.stability](delta_time, delta_temp, time_res, self.t_set)
+            detector.add(scheduler.start, sensor_temp)
+            readings = 1
+            while True:
+                last_temp = sensor_temp
+                now = scheduler.wait()
+                try:
+                    with timed('device_io'):
+                        sensor_temp = sensor.get_sensor_value()
+                    print(f'Current sensor temeprature: {sensor_temp}')
+                except communication_errors() as e:
+                    raise DeviceCommunicationError(f'Communication error when reading temperature: {e}') from e
+                readings += 1
+                if detector.add(now, sensor_temp):
+                    break
+                print(detector.status())
+                scheduler.interval = self._next_interval(scheduler.interval, sensor_temp - last_temp, sensor_temp)
+            print(f'Temperature stabilized after {readings} readings!')
+            fit = detector.fit()
+            record_phase('stabilization', stabilization_start)
+            try:
+                with timed('device_io'):
+                    sensor_temp = sensor.get_sensor_value()
+                print(f'Stable sensor temeprature: {sensor_temp}')
+            except communication_errors() as e:
+                raise DeviceCommunicationError(f'Communication error when reading temperature: {e}') from e
+
+            if fit is not None:
+                print(f'Predicted final temperature: {fit['predicted']:.2f} (time constant {fit['tau']:.0f} s)')
+
+        with timed('logging'):
+            log_actual_temeprature(self.t_set, sensor_temp, fit)
+            log_message(f'Temperature stable: {sensor_temp}'
+                        + (f', predicted final temperature: {fit['predicted']:.2f}' if fit is not None else ''))
+        return sensor_temp
+
+    def _wait_for_ramp(self, heater) -> None:
+        """
+        Sleep until the working setpoint of the heater reached t_set (within delta_temp, or 1 °C for controllers
+        reporting whole degrees). Readings of the sensor during the ramp would only restart the stability countdown.
+        The time left is estimated from the working setpoint and the rate, the controller is checked again once it has
+        passed, but at least every RAMP_CHECK_INTERVAL seconds in case the ramp is changed on the controller.
+        """
+        scheduler = DeadlineScheduler(self.time_res)
+        while True:
+            try:
+                with timed('device_io'):
+                    working_setpoint = heater.get_working_setpoint()
+                    rate = heater.get_rate()
+            except NotImplementedError:
+                print(f'Heater {self.heater} does not report its ramp, not waiting for it!')
+                return
+            except communication_errors() as e:
+                raise DeviceCommunicationError(f'Communication error when reading the ramp: {e}') from e
+
+            if abs(self.t_set - working_setpoint) <= max(self.delta_temp, 1):
+                print(f'Working setpoint reached {working_setpoint}!')
+                return
+            if not rate or rate <= 0:
+                print(f'Working setpoint is {working_setpoint} but the ramp is off, not waiting for it!')
+                return
+            time_left = abs(self.t_set - working_setpoint) / rate * 60
+            print(f'Working setpoint is {working_setpoint}, ramping at {rate} °C/min:'
+                  f' {self.t_set} is reached in about {math.ceil(time_left)} seconds!')
+            scheduler.interval = min(max(time_left, self.time_res), RAMP_CHECK_INTERVAL)
+            scheduler.wait()
+
+    def _next_interval(self, interval: float, change: float, sensor_temp: float) -> float:
+        """
+        Adaptive polling between time_res and time_res_max: While the temperature changes faster than delta_temp per
+        delta_time, it can not be stable yet and the interval is doubled, but only up to half the time the temperature
+        needs to reach the setpoint at its current rate. Otherwise, the interval is halved, so that the sensor is read
+        every time_res seconds near the setpoint.
+        """
+        rate = change / interval
+        if abs(rate) * self.delta_time <= self.delta_temp:
+            return max(interval / 2, self.time_res)
+        next_interval = min(interval * 2, self.time_res_max)
+        if (distance := self.t_set - sensor_temp) * rate > 0:
+            next_interval = min(next_interval, max(distance / rate / 2, self.time_res))
+        return next_interval
+
+
+class WaitAction(Action):
+    __slots__ = ('wait_time',)
+
+    def __init__(self, config: dict):
+        self.wait_time = config['wait_time']
+
+    def describe(self) -> str:
+        return f'Waiting for {self.wait_time} seconds!'
+
+    def execute(self, pool: DevicePool) -> None:
+        print(f'Waiting for {self.wait_time} seconds:')
+        with timed('wait'):
+            scheduler = DeadlineScheduler(1)
+            end = scheduler.start + self.wait_time
+            while (time_left := end - time.monotonic()) > 0:
+                print(f'{math.ceil(time_left)} seconds left!')
+                scheduler.wait(until=end)
+
+
+action_classes = {'set_temp': TemperatureAction,
+                  'set_temp_blind': BlindTemperatureAction,
+                  'gas_ctrl': GasControlAction,
+                  'trigger': TriggerAction,
+                  'multiplexer': MultiplexerAction,
+                  'wait': WaitAction}
+
+
+def compile_action(action_config: dict) -> Action:
+    """Compile a validated action config into its Action object"""
+    if (action_class := action_classes.get(action_config.get('type'))) is None:
+        # This should never be reached as the config was validated before
+        raise ConfigError(f'Invalid action type encountered: {action_config.get('type')}!')
+    return action_class(action_config)
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+from src.helpers.config_diff import diff_configs, report_changes
+from src.helpers.devices import devices
+from src.helpers.file_load import read_config_file, parse_config, prepare_config
+from src.helpers.validate import validate_changes, validate_devices
+
+# Bump this whenever the validation rules or the structure of the cached config change
+CACHE_VERSION = 3
+
+
+def load_validated_config(config_path: Path) -> dict:
+    """
+    Load the config file and validate its devices, reusing the result of an earlier call if the file did not change.
+    The parsed config is pickled next to the config file, keyed by a hash of the file content, the cache version
+    and the device registry. A changed config file (or ElchiCommander update) therefore invalidates the cache.
+    If only the config file changed, it is compared with the cached version instead: the changes are reported and only
+    changed devices and actions are validated, see validate_changes.
+    Otherwise, actions are not validated here, see validate_action_closure.
+    The config is returned ready for execution, see prepare_config, the cache holds it as parsed.
+    Note that the availability of serial ports is not checked again for unchanged devices.
+    """
+    raw_config = read_config_file(config_path)
+    rules = _rules_key()
+    key = _cache_key(raw_config, rules)
+    cache_path = config_cache_path(config_path)
+
+    cached = _read_cache(cache_path)
+    if cached is not None and cached['key'] == key:
+        print(f'Using cached configuration from {cache_path}!')
+        return prepare_config(cached['config'], config_path)
+
+    config = parse_config(raw_config, config_path)
+    if cached is not None and cached.get('rules') == rules:
+        changes = diff_configs(cached['config'], config)
+        report_changes(changes)
+        validate_changes(config, changes)
+    else:
+        validate_devices(config)
+    _write_cache(cache_path, {'key': key, 'rules': rules, 'config': config})
+    return prepare_config(config, config_path)
+
+
+def config_cache_path(config_path: Path) -> Path:
+    return config_path.with_name(config_path.name + '.cache')
+
+
+def _rules_key() -> str:
+    # Everything besides the config file itself that the validation result depends on
+    return hashlib.sha256(f'{CACHE_VERSION}{sorted((t, sorted(d.items())) for t, d in devices.items())}'
+                          .encode()).hexdigest()
+
+
+def _cache_key(raw_config: bytes, rules: str) -> str:
+    digest = hashlib.sha256(raw_config)
+    digest.update(rules.encode())
+    return digest.hexdigest()
+
+
+def _read_cache(cache_path: Path) -> dict | None:
+    try:
+        with open(cache_path, 'rb') as file:
+            cached = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, IndexError):
+        # Missing, unreadable or outdated cache, just validate again
+        return None
+    if not isinstance(cached, dict) or not {'key', 'config'} <= cached.keys():
+        return None
+    return cached
+
+
+def _write_cache(cache_path: Path, cached: dict) -> None:
+    # Write to a temporary file first, so that an interrupted write never leaves a corrupt cache behind
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    try:
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(cached, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        # The cache is only an optimization, failing to write it is not an error
+        print(f'Could not write config cache {cache_path}: {e}')
@@ -0,0 +1,30 @@
+from src.helpers.logging import log_message
+
+
+def diff_configs(old: dict, new: dict) -> dict:
+    """
+    Compare a config with a previously validated version of it.
+    Returns the ids of the added, removed and changed entries of both sections as {'devices_added': [...], ...}
+    and whether the list of include files changed.
+    """
+    changes = {}
+    for section in ('devices', 'actions'):
+        old_entries = old.get(section) if isinstance(old.get(section), dict) else {}
+        new_entries = new.get(section) if isinstance(new.get(section), dict) else {}
+        changes[f'{section}_added'] = [key for key in new_entries if key not in old_entries]
+        changes[f'{section}_removed'] = [key for key in old_entries if key not in new_entries]
+        changes[f'{section}_changed'] = [key for key in new_entries
+                                         if key in old_entries and new_entries[key] != old_entries[key]]
+    changes['includes_changed'] = old.get('includes') != new.get('includes')
+    return changes
+
+
+def report_changes(changes: dict) -> None:
+    """Print and log what changed in the config"""
+    parts = [f'{name.replace('_', ' ')}: {', '.join(str(key) for key in keys)}' for name, keys in changes.items()
+             if name != 'includes_changed' and keys]
+    if changes['includes_changed']:
+        parts.append('include files changed')
+    message = f'Config changed, {'; '.join(parts)}!' if parts else 'Config file changed, but no device or action did!'
+    print(message)
+    log_message(message)
@@ -0,0 +1,93 @@
+import itertools
+from pathlib import Path
+from typing import Iterable
+
+import yaml
+
+
+def write_config(config_path: str | Path, devices: dict, actions: Iterable[tuple[int, dict]],
+                 shard_size: int | None = None, shard_stem: str = 'actions') -> None:
+    """
+    Write a config file with the given devices and (action_id, action) pairs.
+    Actions are written one at a time as they are produced, ranges (e.g. the action_ids of an iterate_list action)
+    one element at a time, so neither the actions nor the file content have to be held in memory as a whole.
+    The result reads like yaml.dump(config, default_flow_style=False).
+    If shard_size is given, the actions are written to include files next to the config file instead, shard_size
+    actions each, named shard_stem_1.yaml, shard_stem_2.yaml, ...
+    """
+    config_path = Path(config_path)
+    if shard_size is None:
+        with open(config_path, 'w', encoding='utf-8') as file:
+            dumper = _open_document(file)
+            _emit(dumper, 'devices')
+            _emit(dumper, devices)
+            _emit(dumper, 'actions')
+            _emit_actions(dumper, actions)
+            _close_document(dumper)
+        return
+
+    includes = []
+    actions = iter(actions)
+    while chunk := list(itertools.islice(actions, shard_size)):
+        includes.append(f'{shard_stem}_{len(includes) + 1}.yaml')
+        with open(config_path.with_name(includes[-1]), 'w', encoding='utf-8') as file:
+            dumper = _open_document(file, mapping=False)
+            _emit_actions(dumper, chunk)
+            dumper.emit(yaml.DocumentEndEvent(explicit=False))
+            dumper.close()
+    with open(config_path, 'w', encoding='utf-8') as file:
+        dumper = _open_document(file)
+        _emit(dumper, 'devices')
+        _emit(dumper, devices)
+        _emit(dumper, 'includes')
+        _emit(dumper, includes)
+        _close_document(dumper)
+
+
+def _open_document(file, mapping: bool = True) -> yaml.SafeDumper:
+    dumper = yaml.SafeDumper(file, default_flow_style=False, default_style='')
+    dumper.open()
+    dumper.emit(yaml.DocumentStartEvent(explicit=False))
+    if mapping:
+        _emit_mapping_start(dumper)
+    return dumper
+
+
+def _close_document(dumper: yaml.SafeDumper) -> None:
+    dumper.emit(yaml.MappingEndEvent())
+    dumper.emit(yaml.DocumentEndEvent(explicit=False))
+    dumper.close()
+
+
+def _emit_actions(dumper: yaml.SafeDumper, actions: Iterable[tuple[int, dict]]) -> None:
+    _emit_mapping_start(dumper)
+    for action_id, action in actions:
+        _emit(dumper, action_id)
+        _emit(dumper, action)
+    dumper.emit(yaml.MappingEndEvent())
+
+
+def _emit_mapping_start(dumper: yaml.SafeDumper) -> None:
+    dumper.emit(yaml.MappingStartEvent(anchor=None, tag=None, implicit=True, flow_style=False))
+
+
+def _emit(dumper: yaml.SafeDumper, data) -> None:
+    if isinstance(data, range):
+        dumper.emit(yaml.SequenceStartEvent(anchor=None, tag=None, implicit=True, flow_style=False))
+        for item in data:
+            _emit(dumper, item)
+        dumper.emit(yaml.SequenceEndEvent())
+    elif isinstance(data, dict):
+        _emit_mapping_start(dumper)
+        for key in sorted(data):
+            _emit(dumper, key)
+            _emit(dumper, data[key])
+        dumper.emit(yaml.MappingEndEvent())
+    else:
+        # Same steps as yaml.dump for a single document, without the document start and end
+        node = dumper.represent_data(data)
+        dumper.represented_objects = {}
+        dumper.anchor_node(node)
+        dumper.serialize_node(node, None, None)
+        dumper.serialized_nodes = {}
+        dumper.anchors = {}
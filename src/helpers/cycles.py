@@ -1,6 +1,8 @@
 import abc
 from abc import ABC
 
+import numpy as np
+
 
 class Cycle(ABC):
     def __init__(self):
@@ -17,10 +19,11 @@ class Cycle(ABC):
         pass
 
     def unroll(self):
-        if self.subcycles is None:
-            return self._to_actions()
-        else:
-            return [item for i in self._to_actions() for item in (i, [sub.unroll() for sub in self.subcycles])]
+        """Yield the actions of this cycle, each followed by all actions of its subcycles, without building lists"""
+        for action in self._to_actions():
+            yield action
+            for subcycle in self.subcycles or ():
+                yield from subcycle.unroll()
 
 
 class TemperatureCycle(Cycle):
@@ -42,8 +45,8 @@ class TemperatureCycle(Cycle):
         return range(start, end + 1, step)
 
     def _to_actions(self):
-        return [{'type': 'set_temp', 'heater': self.heater, 'temp_sensor': self.sensor, 'delta_temp': self.delta_temp,
-                'delta_time': self.delta_time, 'time_res': self.t_res, 't_set': temp} for temp in self.temperatures]
+        return ({'type': 'set_temp', 'heater': self.heater, 'temp_sensor': self.sensor, 'delta_temp': self.delta_temp,
+                 'delta_time': self.delta_time, 'time_res': self.t_res, 't_set': temp} for temp in self.temperatures)
 
 
 class BlindTemperatureCycle(Cycle):
@@ -61,7 +64,7 @@ class BlindTemperatureCycle(Cycle):
         return range(start, end + 1, step)
 
     def _to_actions(self):
-        return [{'type': 'set_temp_blind', 'heater': self.heater, 't_set': temp} for temp in self.temperatures]
+        return ({'type': 'set_temp_blind', 'heater': self.heater, 't_set': temp} for temp in self.temperatures)
 
 
 class TriggerCycle(Cycle):
@@ -71,7 +74,7 @@ class TriggerCycle(Cycle):
         self.states = states
 
     def _to_actions(self):
-        return [
+        return (
             {
                 'type': 'trigger',
                 'triggerbox': self.triggerbox,
@@ -82,7 +85,7 @@ class TriggerCycle(Cycle):
             }
             for state in self.states
             for (s1, s2, s3, s4) in [tuple(state)]
-        ]
+        )
 
 
 class FlowCycle(Cycle):
@@ -92,10 +95,10 @@ class FlowCycle(Cycle):
         self.flow_rates = flow_rates
 
     def _to_actions(self):
-        return [
+        return (
             {
                 'type': 'gas_ctrl',
-                'flow_control': self.flow_controller,
+                'flow_controller': self.flow_controller,
                 'flow_1': s1,
                 'flow_2': s2,
                 'flow_3': s3,
@@ -103,7 +106,7 @@ class FlowCycle(Cycle):
             }
             for flow in self.flow_rates
             for (s1, s2, s3, s4) in [tuple(flow)]
-        ]
+        )
 
 
 class MultiplexerCycle(Cycle):
@@ -113,7 +116,7 @@ class MultiplexerCycle(Cycle):
         self.states = states
 
     def _to_actions(self):
-        return [
+        return (
             {
                 'type': 'multiplexer',
                 'multiplexer': self.multiplexer,
@@ -135,7 +138,7 @@ class MultiplexerCycle(Cycle):
                 'state_L4R4': s44,
             }
             for state in self.states
-            for (s11, s21, s31, s41, s12, s22, s32, s42, s13, s23, s33, s43, s14, s24, s34, s44) in [tuple(state)]]
+            for (s11, s21, s31, s41, s12, s22, s32, s42, s13, s23, s33, s43, s14, s24, s34, s44) in [tuple(state)])
 
 
 class RepCycle(Cycle):
@@ -145,12 +148,65 @@ class RepCycle(Cycle):
         self.repetitions = repetitions
 
     def _to_actions(self):
-        return [{'type': 'wait', 'wait_time': self.wait_time} for _ in range(self.repetitions)]
+        return ({'type': 'wait', 'wait_time': self.wait_time} for _ in range(self.repetitions))
 
 
-def flatten(x):
-    for elem in x:
-        if isinstance(elem, list):
-            yield from flatten(elem)
-        else:
-            yield elem
\ No newline at end of file
+class GridCycle(Cycle):
+    """
+    Cartesian product of several cycles (the axes, outermost first), e.g. temperature x flow x multiplexer.
+    Only the axes that change between two neighbouring grid points are set, so apart from setting up the first point
+    every action corresponds to one grid point.
+    With serpentine ordering, each inner axis reverses its direction whenever an outer axis changes, so that only one
+    axis moves by a single value between neighbouring points (e.g. the heater never jumps from the last to the first
+    temperature). Otherwise, inner axes restart from their first value.
+    The grid points are computed with NumPy in chunks of chunk_size points, so memory does not grow with the grid size.
+    """
+
+    def __init__(self, axes: list[Cycle], serpentine: bool = False, chunk_size: int = 65536):
+        super().__init__()
+        self.axis_actions = [list(axis._to_actions()) for axis in axes]
+        self.shape = tuple(len(actions) for actions in self.axis_actions)
+        self.serpentine = serpentine
+        self.chunk_size = chunk_size
+
+    def grid_indices(self, start: int, stop: int) -> np.ndarray:
+        """Return the axis indices of grid points start to stop in the order they are visited, shape (points, axes)"""
+        raster = np.unravel_index(np.arange(start, stop), self.shape)
+        if not self.serpentine:
+            return np.stack(raster, axis=1)
+        # Reflected mixed radix Gray code: an axis runs backwards whenever the raster index of the outer axes is odd
+        indices = np.empty((stop - start, len(self.shape)), dtype=np.int64)
+        outer = np.zeros(stop - start, dtype=np.int64)
+        for axis, (length, raster_index) in enumerate(zip(self.shape, raster)):
+            indices[:, axis] = np.where(outer % 2 == 1, length - 1 - raster_index, raster_index)
+            outer = outer * length + raster_index
+        return indices
+
+    def unroll(self):
+        """Like Cycle.unroll, but the subcycles follow every grid point, i.e. the last action setting it"""
+        for point in self._points():
+            yield from point
+            for subcycle in self.subcycles or ():
+                yield from subcycle.unroll()
+
+    def _to_actions(self):
+        return (action for point in self._points() for action in point)
+
+    def _points(self):
+        """Yield the actions setting each grid point, one list per point"""
+        points = int(np.prod(self.shape)) if self.shape else 0
+        previous = None
+        for start in range(0, points, self.chunk_size):
+            indices = self.grid_indices(start, min(start + self.chunk_size, points))
+            changed = np.empty(indices.shape, dtype=bool)
+            changed[1:] = indices[1:] != indices[:-1]
+            changed[0] = True if previous is None else indices[0] != previous
+            previous = indices[-1]
+            # Row-major order of the changed entries is the order the actions are executed in: point by point, outer
+            # axes first
+            point_numbers, axes = np.nonzero(changed)
+            entries = list(zip(axes.tolist(), indices[point_numbers, axes].tolist()))
+            position = 0
+            for count in changed.sum(axis=1).tolist():
+                yield [dict(self.axis_actions[axis][index]) for axis, index in entries[position:position + count]]
+                position += count
@@ -0,0 +1,175 @@
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from src.helpers.devices import devices as device_registry, get_device_class, communication_errors
+from src.helpers.errors import AbortedByUserError, DeviceCommunicationError, DeviceConnectionError
+from src.helpers.log_error import log_error
+from src.helpers.queries import query_yes_no
+from src.helpers.timings import timed, record_phase
+
+# Connection attempts before giving up (or asking the user), the delay between them doubles starting at the base delay
+CONNECT_ATTEMPTS = 8
+CONNECT_BASE_DELAY = 0.05
+
+
+class DevicePool:
+    """
+    Keeps device connections open, so that consecutive actions using the same device do not have to reconnect.
+    Devices are connected on first use and stay open until close_all is called.
+    If interactive is set, the user is asked whether to retry when a device can not be connected, otherwise a
+    DeviceConnectionError is raised.
+    If look_ahead is set, prefetch connects the devices of an upcoming action in the background.
+    """
+
+    def __init__(self, devices_config: dict, interactive: bool = True, look_ahead: bool = False):
+        self.devices_config = devices_config
+        self.interactive = interactive
+        self.look_ahead = look_ahead
+        self._devices = {}
+        # Connections in progress, either for the current action or prefetched for an upcoming one
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def get(self, action_config: dict, dev_type: str):
+        """Return the connected device referenced by dev_type in the action config, connect it if necessary"""
+        return self.get_many(action_config, dev_type)[0]
+
+    def get_many(self, action_config: dict, *dev_types: str) -> list:
+        """
+        Return the connected devices referenced by dev_types in the action config.
+        Devices that are not connected yet are connected concurrently, so an action pays for the slowest connection
+        instead of the sum of all of them. Devices already being prefetched are waited for instead of connected again.
+        """
+        dev_ids = {action_config[dev_type]: dev_type for dev_type in dev_types}
+        with self._lock:
+            futures = {dev_id: self._submit(dev_id, dev_type) for dev_id, dev_type in dev_ids.items()
+                       if dev_id not in self._devices}
+        if futures:
+            with timed('connect'):
+                self._collect(futures, dev_ids)
+        return [self._devices[action_config[dev_type]] for dev_type in dev_types]
+
+    def prefetch(self, action_config: dict) -> None:
+        """
+        Start connecting the devices used by an upcoming action in the background, if look_ahead is set.
+        Connecting includes the readiness check of each device. Devices that are connected already but whose port was
+        closed in the meantime are connected again.
+        Failures are only reported once the action actually gets the device.
+        """
+        if not self.look_ahead:
+            return
+        with self._lock:
+            for dev_type, dev_id in action_config.items():
+                if dev_type not in device_registry or dev_id not in self.devices_config:
+                    continue
+                if dev_id in self._devices and not _is_open(self._devices[dev_id]):
+                    print(f'Connection to {dev_id} was lost, reconnecting...')
+                    # Closed anyway, so that the device releases its handles before it is replaced
+                    try:
+                        _close_device(self._devices.pop(dev_id))
+                    except communication_errors() as e:
+                        log_error(f'Communication error when closing {dev_id}: {e}')
+                if dev_id not in self._devices:
+                    self._submit(dev_id, dev_type)
+
+    def _submit(self, dev_id: str, dev_type: str) -> Future:
+        # Must be called with the lock held
+        if (future := self._pending.get(dev_id)) is None:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix='connect')
+            future = self._pending[dev_id] = self._executor.submit(self._try_connect, dev_id, dev_type)
+        return future
+
+    def _collect(self, futures: dict, dev_ids: dict) -> None:
+        wait(futures.values())
+        with self._lock:
+            for dev_id, future in futures.items():
+                self._pending.pop(dev_id, None)
+                # Keep the devices that did connect, so that close_all closes them, even if others raised errors
+                if future.exception() is None and future.result() is not None:
+                    self._devices[dev_id] = future.result()
+        for future in futures.values():
+            if future.exception() is not None:
+                raise future.exception()
+
+        # Only ask the user once all devices have been tried, so that no connection waits for an answer
+        for dev_id in futures:
+            if dev_id not in self._devices:
+                self._devices[dev_id] = self._retry_connect(dev_id, dev_ids[dev_id])
+
+    def _try_connect(self, dev_id: str, dev_type: str):
+        """Connect a device with exponential backoff, return None if all attempts failed"""
+        dev_class, dev_port = self._device_class_and_port(dev_id, dev_type)
+        print(f'Connecting {dev_id} at {dev_port}...')
+        start = time.perf_counter()
+        for attempt in range(CONNECT_ATTEMPTS):
+            try:
+                device = dev_class(dev_port)
+            except communication_errors() as e:
+                if attempt == CONNECT_ATTEMPTS - 1:
+                    print(f'Error connecting {dev_id} at {dev_port}: {e}!')
+                    return None
+                # Jitter keeps devices sharing an adapter (or a USB hub) from retrying in lockstep
+                delay = CONNECT_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5)
+                print(f'Error connecting {dev_id} at {dev_port}: {e}! Retrying in {delay:.2f} seconds...')
+                time.sleep(delay)
+            else:
+                print(f'Device {dev_id} connection successful!')
+                record_phase(f'connect {dev_id}', start)
+                return device
+        return None
+
+    def _retry_connect(self, dev_id: str, dev_type: str):
+        dev_class, dev_port = self._device_class_and_port(dev_id, dev_type)
+        if not self.interactive:
+            raise DeviceConnectionError(f'Failed to connect {dev_id} at {dev_port}!')
+        while query_yes_no(f'Failed to connect {dev_id} at {dev_port}! Retry?'):
+            try:
+                device = dev_class(dev_port)
+            except communication_errors() as e:
+                print(f'Error connecting {dev_id} at {dev_port}: {e}')
+            else:
+                print(f'Device {dev_id} connection successful!')
+                return device
+        else:
+            raise AbortedByUserError('Aborted by user!')
+
+    def _device_class_and_port(self, dev_id: str, dev_type: str) -> tuple[type, str]:
+        return get_device_class(dev_type, self.devices_config[dev_id]['device']), self.devices_config[dev_id]['port']
+
+    def close_all(self) -> None:
+        """Close all open connections, raise a DeviceCommunicationError afterward if any of them failed to close"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for dev_id, future in pending.items():
+            if future.exception() is None and future.result() is not None:
+                self._devices[dev_id] = future.result()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        errors = []
+        while self._devices:
+            dev_id, device = self._devices.popitem()
+            try:
+                with timed('disconnect'):
+                    _close_device(device)
+            except communication_errors() as e:
+                errors.append(f'Communication error when closing {dev_id}: {e}')
+        if errors:
+            raise DeviceCommunicationError('\n'.join(errors))
+
+
+def _is_open(device) -> bool:
+    port = getattr(device, 'serial', device)
+    return getattr(port, 'is_open', True)
+
+
+def _close_device(device) -> None:
+    # Modbus instruments wrap their serial port in .serial, serial devices are the port themselves
+    port = getattr(device, 'serial', device)
+    if callable(close := getattr(port, 'close', None)):
+        close()
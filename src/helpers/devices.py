@@ -1,31 +1,44 @@
-from src.drivers.Aera import ROD4
-from src.drivers.ElchWorks import Ventolino, Valvolino, Thermolino, Thermoplatino, ElchLaser, Omniplex
-from src.drivers.Eurotherms import Eurotherm2408, Eurotherm3216
-from src.drivers.Jumo import JumoQuantol
-from src.drivers.Keithly import Keithly2000Temp
-from src.drivers.Omega import OmegaPt
-from src.drivers.Pyrometer import Pyrometer
-from src.drivers.TestDevices import TestMFC, TestSensor, TestController, NiceTestController, TestValveController, \
-    TestMultiplexer
+import functools
+import importlib
 
+# Drivers are referenced by 'module:class' and only imported once a device is actually connected, so that actions not
+# using a device (or only a test device) do not pay for importing every driver and its dependencies
+devices = {'heater': {'Eurotherm3216': 'src.drivers.Eurotherms:Eurotherm3216',
+                      'Eurotherm2408': 'src.drivers.Eurotherms:Eurotherm2408',
+                      'Omega Pt': 'src.drivers.Omega:OmegaPt',
+                      'Jumo Quantrol': 'src.drivers.Jumo:JumoQuantol',
+                      'Elch Heater Controller': 'src.drivers.ElchWorks:ElchLaser',
+                      'Elchi Laser Control': 'src.drivers.ElchWorks:ElchLaser',
+                      'Test Controller': 'src.drivers.TestDevices:TestController',
+                      'Nice Test Controller': 'src.drivers.TestDevices:NiceTestController'},
+           'temp_sensor': {'Pyrometer': 'src.drivers.Pyrometer:Pyrometer',
+                           'Thermolino': 'src.drivers.ElchWorks:Thermolino',
+                           'Thermoplatino': 'src.drivers.ElchWorks:Thermoplatino',
+                           'Keithly2000': 'src.drivers.Keithly:Keithly2000Temp',
+                           'Test Sensor': 'src.drivers.TestDevices:TestSensor'},
+           'flow_controller': {'Ventolino': 'src.drivers.ElchWorks:Ventolino',
+                               'Area ROD-4': 'src.drivers.Aera:ROD4',
+                               'Test MFC': 'src.drivers.TestDevices:TestMFC'},
+           'triggerbox': {'Omni Trigger': 'src.drivers.ElchWorks:Valvolino',
+                          'Valvolino': 'src.drivers.ElchWorks:Valvolino',
+                          'Test Trigger': 'src.drivers.TestDevices:TestValveController'},
+           'multiplexer': {'Omniplex': 'src.drivers.ElchWorks:Omniplex',
+                           'Test Multiplexer': 'src.drivers.TestDevices:TestMultiplexer'}}
 
-devices = {'heater': {'Eurotherm3216': Eurotherm3216,
-                      'Eurotherm2408': Eurotherm2408,
-                      'Omega Pt': OmegaPt,
-                      'Jumo Quantrol': JumoQuantol,
-                      'Elch Heater Controller': ElchLaser,
-                      'Elchi Laser Control': ElchLaser,
-                      'Test Controller': TestController,
-                      'Nice Test Controller': NiceTestController},
-           'temp_sensor': {'Pyrometer': Pyrometer,
-                           'Thermolino': Thermolino,
-                           'Thermoplatino': Thermoplatino,
-                           'Keithly2000': Keithly2000Temp,
-                           'Test Sensor': TestSensor},
-           'flow_controller': {'Ventolino': Ventolino,
-                               'Area ROD-4': ROD4,
-                               'Test MFC': TestMFC},
-           'triggerbox': {'Omni Trigger': Valvolino,
-                          'Valvolino': Valvolino,
-                          'Test Trigger': TestValveController},
-           'multiplexer': {'Omniplex': Omniplex, 'Test Multiplexer': TestMultiplexer}}
+
+@functools.cache
+def get_device_class(device_type: str, device: str) -> type:
+    """Import the driver module of a device on first use and return its driver class"""
+    module_name, class_name = devices[device_type][device].split(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def communication_errors() -> tuple[type[Exception], ...]:
+    """
+    Return the exceptions drivers raise when the communication with a device fails.
+    Meant to be used as 'except communication_errors()', which is only evaluated (and imports pyserial and
+    minimalmodbus) once an exception actually occurs.
+    """
+    from minimalmodbus import ModbusException
+    from serial import SerialException
+    return SerialException, ModbusException
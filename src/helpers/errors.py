@@ -0,0 +1,36 @@
+class ElchiError(Exception):
+    """
+    Base class for all errors raised while loading the config or executing actions.
+    The command line tools turn these into a message and an exit code, Python scripts can catch them directly.
+    """
+    error_code = 0
+
+
+class ConfigError(ElchiError):
+    """The config file could not be read or is invalid"""
+    error_code = 1
+
+
+class ActionNotFoundError(ElchiError):
+    """The requested action id is not defined in the config file"""
+
+
+class DeviceConnectionError(ElchiError):
+    """A device could not be connected"""
+
+
+class DeviceCommunicationError(ElchiError):
+    """Communication with a connected device failed"""
+
+
+class AbortedByUserError(ElchiError):
+    """The user declined to retry after a failure"""
+
+
+class StepHookError(ElchiError):
+    """The command executed between the steps of a sequence failed"""
+
+
+class LogWriteError(ElchiError):
+    """A log file could not be written"""
+    error_code = 1
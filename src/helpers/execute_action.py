@@ -1,243 +1,100 @@
-import re
-import time
 from pathlib import Path
 
-from minimalmodbus import ModbusException, InvalidResponseError, IllegalRequestError, NoResponseError, Instrument
-from platformdirs import user_config_dir
-from ruamel.yaml import YAML
-from ruamel.yaml.comments import CommentedSeq
-from serial import SerialException, Serial
-
-from src.helpers.devices import devices
-from src.helpers.exit import delayed_exit
-from src.helpers.logging import log_action, log_actual_temeprature
+from src.helpers.actions import compile_action
+from src.helpers.device_pool import DevicePool
+from src.helpers.errors import ActionNotFoundError
+from src.helpers.file_load import default_config_path
 from src.helpers.logging import log_message
-from src.helpers.queries import query_yes_no
-
-
-def execute_massflow_action(action_config: dict, devices_config: dict) -> None:
-    device = _safe_connect_device(action_config, devices_config, 'flow_controller')
-
-    for channel, value in action_config.items():
-        if channel in ['type', 'flow_controller']:
-            continue
-        _chan = int(re.fullmatch(r'^flow_(\d+)$', channel).group(1))
-        try:
-            device.set_flow(_chan, value)
-        except SerialException as e:
-            delayed_exit(f'Communication error when setting flow on channel {channel}: {e}')
-        else:
-            print(f'Set channel {_chan} to {value} %')
-
-    try:
-        device.close()
-    except SerialException as e:
-        delayed_exit(f'Communication error when closing flow controller: {e}')
-
-
-def execute_triggerbox_action(action_config: dict, devices_config: dict) -> None:
-    device = _safe_connect_device(action_config, devices_config, 'triggerbox')
-
-    for channel, value in action_config.items():
-        if channel in ['type', 'triggerbox']:
-            continue
-        _chan = int(re.fullmatch(r'^state_(\d+)$', channel).group(1))
-        try:
-            device.switch_valve(_chan, value)
-        except SerialException as e:
-            delayed_exit(f'Communication error when setting flow on channel {channel}: {e}')
-        else:
-            print(f'Set channel {_chan} to {value}')
-
-    try:
-        device.close()
-    except SerialException as e:
-        delayed_exit(f'Communication error when closing triggerbox: {e}')
-
-
-def execute_multiplexer_action(action_config: dict, devices_config: dict) -> None:
-    device = _safe_connect_device(action_config, devices_config, 'multiplexer')
-
-    for channel, value in action_config.items():
-        if channel in ['type', 'multiplexer']:
-            continue
-        n, m = re.match('^state_L([1-4])R([1-4])$', channel).groups()
-        try:
-            device.set_single_relay((int(n), int(m)), value)
-        except SerialException as e:
-            delayed_exit(f'Communication error when switching relay {channel}: {e}')
-        else:
-            print(f'Set relay L{n}R{m} to {value}')
-
-    try:
-        device.serial.close()
-    except SerialException as e:
-        delayed_exit(f'Communication error when closing multiplexer: {e}')
-
-
-def execute_blind_temperature_action(action_config: dict, devices_config: dict) -> None:
-    device = _safe_connect_device(action_config, devices_config, 'heater')
-    try:
-        device.set_target_setpoint(action_config['t_set'])
-    except (SerialException, InvalidResponseError, IllegalRequestError, NoResponseError, ModbusException) as e:
-        delayed_exit(f'Communication error when setting target temperature: {e}')
-
-    try:
-        if isinstance(device, Serial):
-            device.close()
-        elif isinstance(device, Instrument):
-            device.serial.close()
-    except SerialException as e:
-        delayed_exit(f'Communication error when closing heater: {e}')
-
+from src.helpers.progress import append_progress
+from src.helpers.sweep import sweep_length, sweep_step
+from src.helpers.timings import timed
 
-def execute_temperature_action(action_config: dict, devices_config: dict) -> None | float:
-    heater = _safe_connect_device(action_config, devices_config, 'heater')
-    sensor = _safe_connect_device(action_config, devices_config, 'temp_sensor')
 
-    try:
-        heater.set_target_setpoint(action_config['t_set'])
-    except (SerialException, InvalidResponseError, IllegalRequestError, NoResponseError, ModbusException) as e:
-        delayed_exit(f'Communication error when setting target temperature: {e}')
-    else:
-        print(f'Temperature set to {action_config["t_set"]}!')
-
-    delta_time = action_config['delta_time']
-    delta_temp = action_config['delta_temp']
-    time_res = action_config['time_res']
-    time_of_last_reading = time.time()
-    time_remaining = delta_time
-
-    print('Waiting for temperature to stabilize!')
-    print(f'Checking temperature every {time_res} seconds!')
-    print(f'Waiting until the temperature changes by less than {delta_temp} °C over {delta_time} seconds!')
-
-    try:
-        last_sensor_temp = sensor.get_sensor_value()
-    except SerialException as e:
-        delayed_exit(f'Communication error when reading temperature: {e}')
-    else:
-        while time_remaining > 0:
-            if time.time() - time_of_last_reading > time_res:
-                try:
-                    sensor_temp = sensor.get_sensor_value()
-                    print(f'Current sensor temeprature: {sensor_temp}')
-                except SerialException as e:
-                    delayed_exit(f'Communication error when reading temperature: {e}')
-                else:
-                    time_of_last_reading = time.time()
-                    if abs(sensor_temp - last_sensor_temp) > delta_temp:
-                        last_sensor_temp = sensor_temp
-                        print(f'Temperature deviation larger than {delta_temp}! Resetting countdown!')
-                        time_remaining = delta_time
-                    else:
-                        time_remaining -= time_res
-                        print(f'Time remaining: {time_remaining} seconds!')
-        else:
-            print('Temperature stabilized!')
-        try:
-            sensor_temp = sensor.get_sensor_value()
-            print(f'Stable sensor temeprature: {sensor_temp}')
-        except SerialException as e:
-            delayed_exit(f'Communication error when reading temperature: {e}')
-            sensor_temp = None
-        try:
-            if isinstance(heater, Serial):
-                heater.close()
-            elif isinstance(heater, Instrument):
-                heater.serial.close()
-            sensor.close()
-        except SerialException as e:
-            delayed_exit(f'Communication error when closing heater/sensor: {e}')
-        return sensor_temp
-
-
-def execute_iterate_list_action(_action_id: int, action_config: dict, whole_config: dict) -> None:
+def execute_iterate_list_action(_action_id: int, action_config: dict, whole_config: dict, pool: DevicePool,
+                                config_path: Path, compiled: dict | None = None) -> None | float:
     if action_config['action_ids'] == action_config['processed_actions']:
         print('No more actions to process!')
+        return None
     else:
-        action_id = action_config['action_ids'][len(action_config['processed_actions'])]
-        execute_action(action_id, whole_config)
-
-        config_path = Path(user_config_dir('ElchiCommander', 'ElchWorks', roaming=True)) / 'config.yaml'
-        yaml = YAML()
-        with open(config_path, 'r', encoding='utf-8') as f:
-            data = yaml.load(f)
-
-        iterate_action = data['actions'][_action_id]
-        processed = iterate_action.get('processed_actions', [])
-        processed.append(action_id)
-        iterate_action['processed_actions'] = processed
-        seq = CommentedSeq(processed)
-        seq.fa.set_flow_style()
-        iterate_action["processed_actions"] = seq
-
-        with open(config_path, "w", encoding="utf-8") as f:
-            yaml.dump(data, f)
-
+        step = len(action_config['processed_actions'])
+        action_id = action_config['action_ids'][step]
+        # Connect the devices of the following step while this one is executed
+        if step + 1 < len(action_config['action_ids']) \
+                and isinstance(next_action := whole_config['actions'].get(action_config['action_ids'][step + 1]), dict):
+            pool.prefetch(next_action)
+        result = execute_action(action_id, whole_config, pool, config_path, compiled)
+
+        with timed('progress_update'):
+            append_progress(config_path, _action_id, action_id)
+
+        # Keep the in-memory config in sync for long-running processes
+        action_config['processed_actions'].append(action_id)
+        return result
+
+
+def execute_sweep_action(sweep_id: int, action_config: dict, whole_config: dict, pool: DevicePool,
+                         config_path: Path) -> None | float:
+    step = action_config.get('processed_steps', 0)
+    if step >= (length := sweep_length(action_config)):
+        print('No more sweep steps to process!')
+        return None
+
+    if step + 1 < length:
+        pool.prefetch(sweep_step(action_config, step + 1))
+    result = _execute_action_config(f'{sweep_id} (step {step + 1}/{length})', sweep_step(action_config, step),
+                                    whole_config, pool, config_path)
+
+    with timed('progress_update'):
+        append_progress(config_path, sweep_id, step)
+    action_config['processed_steps'] = step + 1
+    return result
+
+
+def execute_action(action_id, config: dict, pool: DevicePool | None = None, config_path: Path | None = None,
+                   compiled: dict | None = None) -> None | float:
+    """
+    Execute the action with the given id and return its result, i.e., the stable sensor temperature for set_temp
+    actions and None for all others.
+    If a device pool is given, its connections are reused and left open, otherwise all devices used by the action
+    are connected for this action only and closed afterward.
+    The config path is needed by iterate_list and sweep actions to journal their progress, it defaults to the user
+    config file.
+    Actions are compiled into the compiled dict (by action id) and reused from it by later calls, e.g. Session keeps
+    one for its config. Without it, the action is compiled for this call only.
+    Raises an ElchiError if the action fails.
+    """
+    if config_path is None:
+        config_path = default_config_path()
+    if pool is None:
+        pool = DevicePool(config.get('devices'))
+        try:
+            return execute_action(action_id, config, pool, config_path)
+        finally:
+            pool.close_all()
 
-def execute_action(action_id, config: dict) -> None:
-    device_config = config.get('devices')
     action_config = config.get('actions').get(action_id)
     if action_config is None:
-        delayed_exit(f'Action with id {action_id} not found in config file!')
-    else:
-        print(f'Executing action {action_id}...')
+        raise ActionNotFoundError(f'Action with id {action_id} not found in config file!')
+    return _execute_action_config(action_id, action_config, config, pool, config_path, compiled)
 
+
+def _execute_action_config(action_id, action_config: dict, config: dict, pool: DevicePool,
+                           config_path: Path, compiled: dict | None = None) -> None | float:
+    print(f'Executing action {action_id}...')
     match action_config['type']:
-        case 'gas_ctrl':
-            log_action(action_id, action_config)
-            execute_massflow_action(action_config, device_config)
-        case 'trigger':
-            log_action(action_id, action_config)
-            execute_triggerbox_action(action_config, device_config)
-        case 'multiplexer':
-            log_action(action_id, action_config)
-            execute_multiplexer_action(action_config, device_config)
-        case 'set_temp':
-            log_action(action_id, action_config)
-            final_sensor_temp = execute_temperature_action(action_config, device_config)
-            log_actual_temeprature(action_config['t_set'], final_sensor_temp)
-            log_message(f'Temperature stable: {final_sensor_temp}')
-        case 'set_temp_blind':
-            log_action(action_id, action_config)
-            execute_blind_temperature_action(action_config, device_config)
         case 'iterate_list':
-            execute_iterate_list_action(action_id, action_config, config)
-        case 'wait':
-            wait_time = action_config['wait_time']
-            print(f'Waiting for {wait_time} seconds:')
-            for i in range(int(wait_time)):
-                print(f'{wait_time - i} seconds left!')
-                time.sleep(1)
-        case _:
-            # This should never be reached as the config was validated before
-            delayed_exit(f'Invalid action type encountered: {action_config['type']}!')
-
-
-def _safe_connect_device(action_config: dict, devices_config: dict, dev_type: str):
-    dev_id = action_config[dev_type]
-    dev_class = devices[dev_type][devices_config[dev_id]['device']]
-    dev_port = devices_config[dev_id]['port']
-    print(f'Connecting {dev_id} at {dev_port}...')
-    for _ in range(5):
-        try:
-            device = dev_class(dev_port)
-        except SerialException:
-            print(f'Error connecting {dev_id} at {dev_port}! Retrying in 2 seconds...')
-            time.sleep(2)
-        else:
-            print('Device connection successful!')
-            return device
+            return execute_iterate_list_action(action_id, action_config, config, pool, config_path, compiled)
+        case 'sweep':
+            return execute_sweep_action(action_id, action_config, config, pool, config_path)
+
+    if compiled is None:
+        action = compile_action(action_config)
+    elif (cached := compiled.get(action_id)) is not None and cached[0] is action_config:
+        action = cached[1]
     else:
-        while query_yes_no(f'Failed to connect {dev_id} at {dev_port}! Retry?'):
-            try:
-                device = dev_class(dev_port)
-            except SerialException as e:
-                print(f'Error connecting {dev_id} at {dev_port}: {e}')
-            else:
-                print('Device connection successful!')
-                return device
-        else:
-            delayed_exit('Aborted by user!')
-            return None
+        # Stored with the config dict it was compiled from, an included action parsed again is compiled again
+        action = compile_action(action_config)
+        compiled[action_id] = (action_config, action)
+    with timed('logging'):
+        log_message(f'Executing action {action_id}: {action.describe()}')
+    return action.execute(pool)
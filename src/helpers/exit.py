@@ -16,6 +16,12 @@ def delayed_exit(message: str, error_code=0):
     sys.exit(error_code)
 
 
+def report_error(message: str):
+    """Print and log an error without exiting or waiting for the user (used in server mode)"""
+    print(Fore.RED + message + Style.RESET_ALL)
+    log_error(message)
+
+
 def report_success():
     print('Done, exiting in 5 seconds!')
     for i in range(5):
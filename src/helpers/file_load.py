@@ -1,29 +1,52 @@
 from pathlib import Path
 from typing import Dict
 import yaml
-import yaml.scanner
+from platformdirs import user_config_dir
 
-from src.helpers.exit import delayed_exit
+from src.helpers.errors import ConfigError
+from src.helpers.included_actions import resolve_includes
+from src.helpers.progress import apply_progress
 
 
 def load_config(config_path: str | Path) -> Dict:
+    """Load a config file ready for executing its actions, see prepare_config"""
+    return prepare_config(parse_config(read_config_file(config_path), config_path), config_path)
+
+
+def prepare_config(config: Dict, config_path: str | Path) -> Dict:
+    """
+    Resolve the include files of a parsed config and apply the progress journaled for its iterate_list and sweep
+    actions. Every loader of configs for execution calls this, so no step is executed twice, however the config was
+    loaded.
+    """
+    resolve_includes(config, config_path)
+    apply_progress(config, config_path)
+    return config
+
+
+def read_config_file(config_path: str | Path) -> bytes:
     try:
-        with open(config_path, 'r', encoding='utf-8') as file:
-            config = yaml.safe_load(file)
+        with open(config_path, 'rb') as file:
+            return file.read()
     except FileNotFoundError:
-        delayed_exit(
+        raise ConfigError(
             f'Error: Config file not found: {config_path}! You can execute make_default_config.bat'
-            f' in the installation folder to create a default one!', 1)
-    except yaml.scanner.ScannerError as e:
-        delayed_exit(f'Error: Invalid YAML syntax in config file: {e}!'
-                     f' Consult the specification in the colab or execute make_default_config.bat'
-                     f' in the installation folder to create a default one!', 1)
+            f' in the installation folder to create a default one!')
     except PermissionError:
-        delayed_exit(f'Error: Permission denied reading: {config_path}', 1)
+        raise ConfigError(f'Error: Permission denied reading: {config_path}')
     except OSError as e:
-        delayed_exit(f'Error reading {config_path}: {e}', 1)
+        raise ConfigError(f'Error reading {config_path}: {e}')
+
+
+def parse_config(raw_config: bytes, config_path: str | Path) -> Dict:
+    try:
+        config = yaml.safe_load(raw_config.decode('utf-8'))
+    except (yaml.YAMLError, UnicodeDecodeError) as e:
+        raise ConfigError(f'Error: Invalid YAML syntax in config file: {e}!'
+                          f' Consult the specification in the colab or execute make_default_config.bat'
+                          f' in the installation folder to create a default one!')
     if not isinstance(config, dict):
-        delayed_exit(
+        raise ConfigError(
             'Error: Invalid config format! Consult the specification in the colab or execute make_default_config.bat'
             f' in the installation folder to create a default one!')
 
@@ -31,3 +54,10 @@ def load_config(config_path: str | Path) -> Dict:
     print(yaml.dump(config, default_flow_style=False, default_style=''))
 
     return config
+
+
+def default_config_path() -> Path:
+    """Return the path of the config file in the user config directory, create the directory if necessary"""
+    config_dir = Path(user_config_dir('ElchiCommander', 'ElchWorks', roaming=True))
+    config_dir.mkdir(parents=True, exist_ok=True)
+    return config_dir / 'config.yaml'
@@ -0,0 +1,180 @@
+import json
+import os
+import re
+import struct
+from collections.abc import Mapping
+from pathlib import Path
+
+import yaml
+
+from src.helpers.errors import ConfigError
+
+# Bump this whenever the layout of the index file changes
+INDEX_VERSION = 1
+# action id, include file number, byte offset and length of the action in the include file
+_record = struct.Struct('<qIQI')
+# Top level keys of an include file, i.e. the action ids
+_action_key = re.compile(rb'^(-?\d+)[ \t]*:', re.MULTILINE)
+
+
+class IncludedActions(Mapping):
+    """
+    The actions of a config whose actions are split across include files, e.g.
+
+        devices: ...
+        includes:
+          - actions_1.yaml
+          - actions_2.yaml
+
+    Each include file maps action ids to actions, just like the actions section of the config file. Actions given in
+    the config file itself are used as well.
+    Included actions are only parsed when they are accessed. A sidecar index (config.yaml.index) stores the include
+    file, byte offset and length of every action sorted by id, so finding an action takes a binary search over the
+    index instead of parsing all include files. The include files are checked for changes on every lookup, if one
+    changed, the index is rebuilt and the loaded actions are parsed again.
+    """
+
+    def __init__(self, inline_actions: dict, config_path: str | Path, includes: list):
+        self._inline = inline_actions
+        self._loaded = {}
+        # Called with the id and the action whenever an included action is loaded
+        self.on_load = None
+        config_path = Path(config_path)
+        self._files = [config_path.parent / include for include in includes]
+        self._index_path = config_path.with_name(config_path.name + '.index')
+        self._states = None
+        self._refresh()
+
+    def changed(self) -> bool:
+        """Whether an include file changed on disk since the index was last checked"""
+        return [_file_state(file) for file in self._files] != self._states
+
+    def _refresh(self) -> None:
+        # Rebuild the index if an include file changed, actions loaded from the old files are dropped
+        if (states := [_file_state(file) for file in self._files]) == self._states:
+            return
+        self._header_size = _ensure_index(self._index_path, self._files, states)
+        self._count = (self._index_path.stat().st_size - self._header_size) // _record.size
+        self._states = states
+        self._loaded = {}
+
+    def __getitem__(self, action_id):
+        if action_id in self._inline:
+            return self._inline[action_id]
+        self._refresh()
+        if action_id not in self._loaded:
+            if (location := self._find(action_id)) is None:
+                raise KeyError(action_id)
+            self._loaded[action_id] = _load_action(self._files[location[0]], *location[1:], action_id)
+            if self.on_load is not None:
+                self.on_load(action_id, self._loaded[action_id])
+        return self._loaded[action_id]
+
+    def loaded(self) -> dict:
+        """The actions given in the config file and the included actions that were loaded already"""
+        return {**self._inline, **self._loaded}
+
+    def __contains__(self, action_id):
+        if action_id in self._inline:
+            return True
+        self._refresh()
+        return action_id in self._loaded or self._find(action_id) is not None
+
+    def __iter__(self):
+        yield from self._inline
+        self._refresh()
+        with open(self._index_path, 'rb') as file:
+            file.seek(self._header_size)
+            for action_id, *_ in _record.iter_unpack(file.read()):
+                if action_id not in self._inline:
+                    yield action_id
+
+    def __len__(self):
+        return len(set(self))
+
+    def _find(self, action_id) -> tuple[int, int, int] | None:
+        if not isinstance(action_id, int) or isinstance(action_id, bool):
+            return None
+        with open(self._index_path, 'rb') as file:
+            low, high = 0, self._count
+            while low < high:
+                middle = (low + high) // 2
+                file.seek(self._header_size + middle * _record.size)
+                record_id, file_number, offset, length = _record.unpack(file.read(_record.size))
+                if record_id == action_id:
+                    return file_number, offset, length
+                if record_id < action_id:
+                    low = middle + 1
+                else:
+                    high = middle
+        return None
+
+
+def resolve_includes(config: dict, config_path: str | Path) -> None:
+    """Replace the actions of a config with include files by IncludedActions, configs without includes are unchanged"""
+    if (includes := config.get('includes')) is None:
+        return
+    if not isinstance(includes, list) or not all(isinstance(include, str) for include in includes):
+        raise ConfigError('Invalid entry includes in config file! Expected a list of file names!')
+    config['actions'] = IncludedActions(config.get('actions') or {}, config_path, includes)
+
+
+def _ensure_index(index_path: Path, files: list[Path], states: list[tuple[int, int]]) -> int:
+    """Rebuild the index if it is missing or outdated and return the size of its header"""
+    files_state = [[str(file), *state] for file, state in zip(files, states)]
+    header = json.dumps({'version': INDEX_VERSION, 'files': files_state}).encode('utf-8') + b'\n'
+    try:
+        with open(index_path, 'rb') as file:
+            if file.read(len(header)) == header:
+                return len(header)
+    except OSError:
+        pass
+
+    print(f'Indexing included actions for {index_path}...')
+    records = {}
+    for file_number, path in enumerate(files):
+        data = path.read_bytes()
+        keys = list(_action_key.finditer(data))
+        if not keys and data.strip():
+            raise ConfigError(f'Invalid include file {path}! Expected one action per line starting with its id.')
+        for key, next_key in zip(keys, [*keys[1:], None]):
+            action_id = int(key.group(1))
+            if action_id in records:
+                raise ConfigError(f'Action {action_id} is defined more than once in the include files!')
+            end = next_key.start() if next_key is not None else len(data)
+            records[action_id] = (file_number, key.start(), end - key.start())
+
+    # Write to a temporary file first, so that an interrupted write never leaves a corrupt index behind
+    tmp_path = index_path.with_name(index_path.name + '.tmp')
+    try:
+        with open(tmp_path, 'wb') as file:
+            file.write(header)
+            file.write(b''.join(_record.pack(action_id, *records[action_id]) for action_id in sorted(records)))
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        raise ConfigError(f'Error writing index {index_path}: {e}') from e
+    return len(header)
+
+
+def _file_state(path: Path) -> tuple[int, int]:
+    try:
+        stat = path.stat()
+    except OSError as e:
+        raise ConfigError(f'Error reading include file {path}: {e}') from e
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _load_action(path: Path, offset: int, length: int, action_id: int) -> dict:
+    try:
+        with open(path, 'rb') as file:
+            file.seek(offset)
+            data = file.read(length)
+        # The C loader (if PyYAML was built with it) is much faster for long lists like the action_ids of iterate_list
+        parsed = yaml.load(data.decode('utf-8'), Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+    except OSError as e:
+        raise ConfigError(f'Error reading include file {path}: {e}') from e
+    except (yaml.YAMLError, UnicodeDecodeError) as e:
+        raise ConfigError(f'Error: Invalid YAML syntax for action {action_id} in {path}: {e}!') from e
+    if not isinstance(parsed, dict) or action_id not in parsed:
+        raise ConfigError(f'Invalid action {action_id} in include file {path}!')
+    return parsed[action_id]
@@ -0,0 +1,28 @@
+import sys
+from multiprocessing.connection import Client
+
+# Named pipe on Windows, local TCP socket everywhere else
+SERVER_ADDRESS = r'\\.\pipe\ElchiCommander' if sys.platform == 'win32' else ('localhost', 47183)
+AUTHKEY = b'ElchiCommander'
+
+
+def request_action(action_id: int) -> int:
+    """
+    Ask a running ElchiCommander server to execute an action and wait for it to finish.
+    Returns the exit code of the action, raises ConnectionError if no server is running.
+    """
+    return _send_request({'action_id': action_id})
+
+
+def request_stop() -> int:
+    """Ask a running ElchiCommander server to close all devices and shut down"""
+    return _send_request({'stop': True})
+
+
+def _send_request(request: dict) -> int:
+    try:
+        with Client(SERVER_ADDRESS, authkey=AUTHKEY) as connection:
+            connection.send(request)
+            return connection.recv()
+    except (OSError, EOFError) as e:
+        raise ConnectionError(f'No ElchiCommander server running at {SERVER_ADDRESS}!') from e
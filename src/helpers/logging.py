@@ -3,10 +3,11 @@ from pathlib import Path
 
 from platformdirs import user_config_dir
 
-from src.helpers.exit import delayed_exit
+from src.helpers.errors import LogWriteError
 
 
 def log_message(message):
+    """Append a message to the daily log, raises a LogWriteError if the log can not be written"""
     log_dir = Path(user_config_dir('ElchiCommander', 'ElchWorks', roaming=True))
     log_dir.mkdir(parents=True, exist_ok=True)
     log_path = log_dir / f'log_{datetime.datetime.now().strftime("%Y-%m-%d")}.txt'
@@ -15,42 +16,18 @@ def log_message(message):
             file.write(f'{datetime.datetime.now().strftime("%Y-%m-%dT%H-%M-%S")}, ')
             file.write(f'{datetime.datetime.now(datetime.UTC).timestamp()}: ')
             file.write(f'{message}\n')
-    except PermissionError:
-        delayed_exit(f'Error: Permission denied reading: {log_path}', 1)
+    except PermissionError as e:
+        raise LogWriteError(f'Error: Permission denied writing: {log_path}') from e
     except OSError as e:
-        delayed_exit(f'Error reading {log_path}: {e}', 1)
+        raise LogWriteError(f'Error writing {log_path}: {e}') from e
 
 
-def log_action(action_id: int, action_config: dict):
-    message = f'Executing action {action_id}: '
-    match action_config['type']:
-        case 'set_temp':
-            message += (f'Setting temeprature of {action_config['heater']} to {action_config['t_set']}'
-                        f' and wait until the temperature of {action_config['temp_sensor']} changes by less than'
-                        f' {action_config['delta_temp']} for {action_config['delta_time']} seconds!')
-        case 'set_temp_blind':
-            message += f'Setting temeprature of {action_config["heater"]} to {action_config["t_set"]}!'
-        case 'trigger':
-            message += f'Setting triigerbox {action_config['triggerbox']} to:'
-            message += ', '.join(f'{key}: {value}' for key, value in action_config.items()
-                                 if key not in ['type', 'triggerbox'])
-        case 'gas_ctrl':
-            message = f'Setting flow controller {action_config['flow_controller']} to:'
-            message += ', '.join(f'{key}: {value}' for key, value in action_config.items()
-                                 if key not in ['type', 'flow_controller'])
-        case 'multiplexer':
-            message = f'Setting multiplexer {action_config['multiplexer']} to:'
-            message += ', '.join(f'{key}: {value}' for key, value in action_config.items()
-                                 if key not in ['type', 'multiplexer'])
-        case 'wait':
-            message += f'Waiting for {action_config["wait_time"]} seconds!'
-        case _:
-            # Should be unreachable as the config was validated before
-            delayed_exit(f'Invalid action type encountered: {action_config["type"]}', 1)
-    log_message(message)
-
-
-def log_actual_temeprature(setpoint: float, actual_temp: float):
+def log_actual_temeprature(setpoint: float, actual_temp: float, fit: dict | None = None):
+    """
+    Append setpoint and stabilized temperature to the daily temperature log.
+    If the temperature curve was fitted (stability: predictive), the predicted final temperature, time constant,
+    amplitude and fit residual follow as further columns.
+    """
     log_dir = Path(user_config_dir('ElchiCommander', 'ElchWorks', roaming=True))
     log_dir.mkdir(parents=True, exist_ok=True)
     log_path = log_dir / f'temperature_log_{datetime.datetime.now().strftime("%Y-%m-%d")}.txt'
@@ -58,8 +35,11 @@ def log_actual_temeprature(setpoint: float, actual_temp: float):
         with open(log_path, 'a') as file:
             file.write(f'{datetime.datetime.now().strftime("%Y-%m-%dT%H-%M-%S")}, ')
             file.write(f'{datetime.datetime.now(datetime.UTC).timestamp()}, ')
-            file.write(f'{setpoint:.2f}, {actual_temp:.2f}\n')
-    except PermissionError:
-        delayed_exit(f'Error: Permission denied reading: {log_path}', 1)
+            file.write(f'{setpoint:.2f}, {actual_temp:.2f}')
+            if fit is not None:
+                file.write(f', {fit['predicted']:.2f}, {fit['tau']:.1f}, {fit['amplitude']:.3f}, {fit['rmse']:.3f}')
+            file.write('\n')
+    except PermissionError as e:
+        raise LogWriteError(f'Error: Permission denied writing: {log_path}') from e
     except OSError as e:
-        delayed_exit(f'Error reading {log_path}: {e}', 1)
+        raise LogWriteError(f'Error writing {log_path}: {e}') from e
@@ -0,0 +1,63 @@
+import json
+import time
+from pathlib import Path
+
+from platformdirs import user_config_dir
+
+# Placeholder port that is always accepted, used for test devices
+TEST_PORT = 'COMXY'
+# Seconds for which the ports found by one invocation are reused by the following ones
+PORT_CACHE_TTL = 10
+
+
+# Ports found in this process and the monotonic time they were found at
+_ports: tuple[float, tuple[str, ...]] | None = None
+
+
+def available_ports(refresh: bool = False) -> tuple[str, ...]:
+    """
+    Return the serial ports available on this system.
+    Enumerating ports is slow on systems with many adapters, so the result is reused for PORT_CACHE_TTL seconds, within
+    the process and, for back-to-back invocations of ElchiCommander, on disk.
+    With refresh set, the ports are enumerated again instead of using either cache (e.g., to check whether a port has
+    been connected just now), and the new result replaces the cached one.
+    """
+    global _ports
+    if not refresh:
+        if _ports is not None and 0 <= time.monotonic() - _ports[0] < PORT_CACHE_TTL:
+            return _ports[1]
+        if (ports := _read_port_cache()) is not None:
+            _ports = (time.monotonic(), ports)
+            return ports
+
+    # Imported here, so that invocations not checking any port do not need pyserial
+    import serial.tools.list_ports
+    ports = tuple(port.device for port in serial.tools.list_ports.comports())
+    _ports = (time.monotonic(), ports)
+    _write_port_cache(ports)
+    return ports
+
+
+def _port_cache_path() -> Path:
+    return Path(user_config_dir('ElchiCommander', 'ElchWorks', roaming=True)) / 'ports.json'
+
+
+def _read_port_cache() -> tuple[str, ...] | None:
+    try:
+        with open(_port_cache_path(), 'r', encoding='utf-8') as file:
+            cached = json.load(file)
+        if 0 <= time.time() - cached['timestamp'] < PORT_CACHE_TTL:
+            return tuple(cached['ports'])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_port_cache(ports: tuple[str, ...]) -> None:
+    try:
+        _port_cache_path().parent.mkdir(parents=True, exist_ok=True)
+        with open(_port_cache_path(), 'w', encoding='utf-8') as file:
+            json.dump({'timestamp': time.time(), 'ports': list(ports)}, file)
+    except OSError:
+        # The cache is only an optimization, the ports are simply enumerated again next time
+        pass
@@ -0,0 +1,116 @@
+import json
+import os
+from pathlib import Path
+
+from src.helpers.errors import ConfigError
+from src.helpers.included_actions import IncludedActions
+
+
+def progress_path(config_path: str | Path) -> Path:
+    """The progress journal is stored next to the config file, e.g. config.yaml.progress"""
+    config_path = Path(config_path)
+    return config_path.with_name(config_path.name + '.progress')
+
+
+def read_progress(config_path: str | Path) -> dict:
+    """
+    Read the progress journal of the config file and return the executed steps of each iterate_list or sweep action as
+    {action_id: [step, ...]} in the order they were executed. Steps of iterate_list actions are the executed action
+    ids, steps of sweep actions the step numbers.
+    """
+    try:
+        data = progress_path(config_path).read_bytes()
+    except FileNotFoundError:
+        return {}
+    except OSError as e:
+        raise ConfigError(f'Error reading progress file {progress_path(config_path)}: {e}') from e
+
+    progress = {}
+    # The last element is either empty or a line torn by a crash while it was written, that step is executed again
+    for line in data.split(b'\n')[:-1]:
+        try:
+            entry = json.loads(line)
+            progress.setdefault(entry['list'], []).append(entry['action'])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return progress
+
+
+def apply_progress(config: dict, config_path: str | Path) -> None:
+    """
+    Extend the processed_actions of all iterate_list actions in the loaded config by the journaled progress and set
+    processed_steps of all sweep actions.
+    Actions from include files get their progress once they are loaded. The journal is read again then, since an
+    action is loaded again whenever its include file changed, after steps may have been executed in this process.
+    """
+    progress = read_progress(config_path)
+    actions = config.get('actions', {})
+    if isinstance(actions, IncludedActions):
+        actions.on_load = lambda action_id, action: _apply_action_progress(action,
+                                                                          read_progress(config_path).get(action_id))
+        actions = actions.loaded()
+    for list_id, processed in progress.items():
+        _apply_action_progress(actions.get(list_id), processed)
+
+
+def _apply_action_progress(action, processed: list | None) -> None:
+    if processed is None or not isinstance(action, dict):
+        return
+    if action.get('type') == 'iterate_list':
+        action['processed_actions'] = [*action.get('processed_actions', []), *processed]
+    elif action.get('type') == 'sweep':
+        action['processed_steps'] = len(processed)
+
+
+def append_progress(config_path: str | Path, list_id, action_id) -> None:
+    """
+    Journal that an iterate_list action executed action_id, or that a sweep action executed step action_id.
+    A single line is appended and synced to disk, the cost is independent of the size of the config and the journal.
+    """
+    path = progress_path(config_path)
+    line = json.dumps({'list': list_id, 'action': action_id}).encode('utf-8') + b'\n'
+    try:
+        with open(path, 'a+b') as file:
+            # Start a new line if the last one was torn by a crash, so that it is skipped as a whole when reading
+            if file.seek(0, os.SEEK_END) > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':
+                    line = b'\n' + line
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+    except OSError as e:
+        raise ConfigError(f'Error writing progress file {path}: {e}') from e
+
+
+if __name__ == '__main__':
+    # Regression check: editing an include file during a sequence must not lose the steps executed since the start of
+    # the session, python -m src.helpers.progress
+    import tempfile
+    from src.helpers.session import Session
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, edit_after in (('run', None), ('run_sequence', 1)):
+            path = Path(directory) / name / 'config.yaml'
+            path.parent.mkdir()
+            path.write_text('devices: {}\nincludes:\n  - steps.yaml\n', encoding='utf-8')
+            steps = path.with_name('steps.yaml')
+            steps.write_text('0: {type: iterate_list, action_ids: [1, 2, 3], processed_actions: []}\n'
+                             + ''.join(f'{i}: {{type: wait, wait_time: 1}}\n' for i in (1, 2, 3)), encoding='utf-8')
+
+            def edit_include(*_):
+                with open(steps, 'a', encoding='utf-8') as file:
+                    file.write('4: {type: wait, wait_time: 1}\n')
+
+            with Session(path, use_cache=False) as session:
+                if edit_after is None:
+                    session.run(0)
+                    session.run(0)
+                    edit_include()
+                    session.run(0)
+                else:
+                    session.run_sequence(0, lambda step, *_: edit_include() if step == edit_after else None)
+            assert read_progress(path) == {0: [1, 2, 3]}, read_progress(path)
+            with Session(path, use_cache=False) as session:
+                assert session.config['actions'][0]['processed_actions'] == [1, 2, 3]
+    print('Progress survives changed include files!')
@@ -0,0 +1,32 @@
+import time
+
+
+class DeadlineScheduler:
+    """
+    Sleeps until evenly spaced deadlines on the monotonic clock, e.g. for polling a sensor every interval seconds.
+    Deadlines are computed from the start instead of from the end of the last sleep, so the time spent reading a device
+    or printing between two calls does not add up to a drift. If a deadline has already passed (e.g. a slow device),
+    wait returns immediately and the schedule continues from then on, instead of catching up with a burst of calls.
+    Unlike time.time(), the monotonic clock is not affected by changes of the system clock.
+    """
+    __slots__ = ('interval', 'start', 'deadline')
+
+    def __init__(self, interval: float, start: float | None = None):
+        self.interval = interval
+        self.start = time.monotonic() if start is None else start
+        self.deadline = self.start
+
+    def wait(self, until: float | None = None) -> float:
+        """
+        Sleep until the next deadline, or until the given monotonic time if that is earlier.
+        Return the monotonic time after sleeping.
+        """
+        self.deadline += self.interval
+        if until is not None:
+            self.deadline = min(self.deadline, until)
+        if (delay := self.deadline - time.monotonic()) > 0:
+            time.sleep(delay)
+        else:
+            # Behind schedule, continue from now
+            self.deadline -= delay
+        return time.monotonic()
@@ -0,0 +1,124 @@
+import re
+from typing import NamedTuple
+
+from src.helpers.devices import devices as valid_devices
+
+
+class Bounds(NamedTuple):
+    """Inclusive range of valid numbers"""
+    low: float
+    high: float
+
+    def __contains__(self, value) -> bool:
+        return isinstance(value, (int, float)) and self.low <= value <= self.high
+
+    def __str__(self) -> str:
+        return f'{self.low} to {self.high}'
+
+
+class Channels(NamedTuple):
+    """Channel entries of an action, e.g. flow_1 to flow_4, given by a regex for their keys and their valid values"""
+    pattern: str
+    names: str
+    values: Bounds | tuple
+
+    def describe_values(self) -> str:
+        return str(self.values) if isinstance(self.values, Bounds) else ' or '.join(map(str, self.values))
+
+
+# Every action type with the devices it uses, its required values, its optional entries and the channels it may set.
+# Pairs of entries in 'ordered' must not decrease, e.g. a minimum and a maximum.
+# Both the validation of config files and ElchiCreator use these, see compile_schema.
+action_types = {
+    'set_temp': {'devices': ('heater', 'temp_sensor'),
+                 'values': {'t_set': Bounds(-200, 1500),
+                            'delta_temp': Bounds(0.01, 100),
+                            'delta_time': Bounds(1, 1_000_000),
+                            'time_res': Bounds(1, 100)},
+                 'options': {'stability': ('reset', 'slope', 'peak_to_peak', 'predictive'),
+                             'time_res_max': Bounds(1, 3600),
+                             'rate': Bounds(0, 1000),
+                             'wait_for_ramp': (False, True)},
+                 'ordered': (('time_res', 'time_res_max'),)},
+    'set_temp_blind': {'devices': ('heater',),
+                       'values': {'t_set': Bounds(-200, 1500)}},
+    'gas_ctrl': {'devices': ('flow_controller',),
+                 'channels': Channels(r'flow_[1-4]', 'flow_1, flow_2, flow_3 and flow_4', Bounds(0, 100))},
+    'trigger': {'devices': ('triggerbox',),
+                'channels': Channels(r'state_[1-4]', 'state_1, state_2, state_3 and state_4', (0, 1))},
+    'multiplexer': {'devices': ('multiplexer',),
+                    'channels': Channels(r'state_L[1-4]R[1-4]', 'state_LnRm, where n and m are 1 to 4', (0, 1))},
+    'wait': {'values': {'wait_time': Bounds(1, 1_000_000)}},
+}
+
+
+class ActionSchema:
+    """An entry of action_types compiled for checking actions, the channel regex is only compiled once"""
+    __slots__ = ('devices', 'values', 'options', 'ordered', 'channels', 'channel_key', 'fixed_keys')
+
+    def __init__(self, devices: tuple = (), values: dict | None = None, options: dict | None = None,
+                 ordered: tuple = (), channels: Channels | None = None):
+        self.devices = devices
+        self.values = values or {}
+        # Optional entries with their valid values (Bounds or a tuple of choices), the first choice is the default
+        self.options = options or {}
+        self.ordered = ordered
+        self.channels = channels
+        self.channel_key = re.compile(channels.pattern).fullmatch if channels is not None else None
+        self.fixed_keys = frozenset(('type', *self.devices, *self.values, *self.options))
+
+    def check(self, action: dict, device_config: dict) -> list[str]:
+        """Check an action of this type against the devices of the config and return all problems found"""
+        errors = []
+        for device_type in self.devices:
+            if device_type not in action:
+                errors.append(f'Missing entry {device_type} in action preset!')
+            elif (device := device_config.get(action[device_type])) is None:
+                errors.append(f'Specified {device_type} {action[device_type]} not defined in device section!')
+            elif not isinstance(device, dict) or device.get('device') not in valid_devices[device_type]:
+                errors.append(f'Specified {device_type} {device} is not a valid {device_type} device!'
+                              f' Valid devices are: {', '.join(valid_devices[device_type])}')
+
+        for key, bounds in self.values.items():
+            if key not in action:
+                errors.append(f'Missing entry {key} in action preset!')
+            elif action[key] not in bounds:
+                errors.append(f'Invalid value encountered for {key}: {action[key]}! Valid values are: {bounds}')
+
+        for key, valid in self.options.items():
+            if key in action and action[key] not in valid:
+                errors.append(f'Invalid value encountered for {key}: {action[key]}! Valid values are: '
+                              f'{valid if isinstance(valid, Bounds) else ', '.join(map(str, valid))}')
+
+        for low, high in self.ordered:
+            if isinstance(action.get(low), (int, float)) and isinstance(action.get(high), (int, float)) \
+                    and action[low] > action[high]:
+                errors.append(f'Invalid value encountered for {high}: {action[high]}! Must not be less than {low}')
+
+        if self.channels is not None:
+            for key, value in action.items():
+                if key in self.fixed_keys:
+                    continue
+                if not isinstance(key, str) or not self.channel_key(key):
+                    errors.append(f'Invalid channel encountered: {key}! Valid channels are: {self.channels.names}!')
+                elif value not in self.channels.values:
+                    errors.append(f'Invalid value encountered for channel {key}: {value}!'
+                                  f' Valid values are: {self.channels.describe_values()}')
+        return errors
+
+
+def compile_schema(types: dict) -> dict[str, ActionSchema]:
+    return {action_type: ActionSchema(**spec) for action_type, spec in types.items()}
+
+
+action_schemas = compile_schema(action_types)
+
+
+def check_action(action: dict, device_config: dict) -> list[str]:
+    """Return all problems of a (non-meta) action, an empty list if it is valid"""
+    if 'type' not in action:
+        return ['Missing type entry in action preset!']
+    if (schema := action_schemas.get(action['type'])) is None:
+        return [f'Invalid action type encountered: {action['type']}!'
+                f' Valid action types are: {', '.join(action_schemas)}']
+    return schema.check(action, device_config)
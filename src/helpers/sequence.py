@@ -0,0 +1,41 @@
+import os
+import subprocess
+import time
+from typing import Callable
+
+from src.helpers.errors import StepHookError
+from src.helpers.logging import log_message
+from src.helpers.timings import timed
+
+
+def step_hook(command: str | None = None, wait_time: float = 0) -> Callable[[int, int, None | float], None]:
+    """
+    Return a function for Session.run_sequence that marks the external measurement after every step:
+    It runs command (if given) and waits for it to finish, then waits for wait_time seconds.
+    The command is executed by the shell with the environment variables ELCHI_STEP, ELCHI_ACTION_ID and ELCHI_RESULT
+    set to the step number, the executed action and its result (the stable temperature for set_temp actions, empty
+    otherwise).
+    """
+
+    def after_step(step: int, action_id: int, result: None | float) -> None:
+        if command:
+            print(f'Running step command: {command}')
+            with timed('step_command'):
+                try:
+                    process = subprocess.run(command, shell=True, env=_step_environment(step, action_id, result))
+                except OSError as e:
+                    raise StepHookError(f'Could not run step command {command}: {e}') from e
+            if process.returncode != 0:
+                raise StepHookError(f'Step command {command} failed with exit code {process.returncode}!')
+            log_message(f'Step command finished for step {step}, action {action_id}!')
+        if wait_time > 0:
+            print(f'Waiting {wait_time} seconds for the measurement...')
+            with timed('step_wait'):
+                time.sleep(wait_time)
+
+    return after_step
+
+
+def _step_environment(step: int, action_id: int, result: None | float) -> dict:
+    return {**os.environ, 'ELCHI_STEP': str(step), 'ELCHI_ACTION_ID': str(action_id),
+            'ELCHI_RESULT': '' if result is None else str(result)}
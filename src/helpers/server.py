@@ -0,0 +1,111 @@
+import traceback
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+from pathlib import Path
+
+from src.helpers.errors import ElchiError, LogWriteError
+from src.helpers.exit import report_error
+from src.helpers.included_actions import IncludedActions
+from src.helpers.ipc import SERVER_ADDRESS, AUTHKEY
+from src.helpers.log_error import log_error
+from src.helpers.logging import log_message
+from src.helpers.session import Session
+from src.helpers.timings import report_timings, reset_timings
+
+
+def serve(config_path: Path) -> None:
+    """
+    Run ElchiCommander as a resident server.
+    The config is parsed once and devices stay connected between actions. Actions are requested by elchi_client.
+    The config is reloaded whenever the file or one of its include files changes on disk. Errors are logged and
+    returned to the client as exit code, the server never waits for input, so devices that can not be connected are not
+    retried interactively either.
+    """
+    try:
+        config_mtime = config_path.stat().st_mtime
+    except OSError:
+        # Session reports the missing or unreadable config file
+        config_mtime = None
+    session = Session(config_path, interactive=False, look_ahead=True)
+
+    with Listener(SERVER_ADDRESS, authkey=AUTHKEY) as listener:
+        print(f'ElchiCommander server listening at {SERVER_ADDRESS}!')
+        log_message(f'ElchiCommander server started at {SERVER_ADDRESS}!')
+        try:
+            while True:
+                try:
+                    with listener.accept() as connection:
+                        request = connection.recv()
+                        if not _valid_request(request):
+                            report_error(f'Invalid request received: {request!r}!')
+                            connection.send(1)
+                            continue
+                        if request.get('stop'):
+                            connection.send(0)
+                            break
+
+                        exit_code, config_mtime = _serve_action(request['action_id'], session, config_mtime)
+                        report_timings()
+                        reset_timings()
+                        connection.send(exit_code)
+                except (EOFError, OSError, AuthenticationError) as e:
+                    # A client that failed to authenticate or disconnected early only loses its own request
+                    report_error(f'Connection to client failed: {e!r}')
+        finally:
+            session.close()
+            log_message('ElchiCommander server stopped!')
+
+
+def _serve_action(action_id: int, session: Session, config_mtime: float) -> tuple[int, float]:
+    """
+    Run a requested action, reloading the config first if it changed.
+    Return the exit code and the modification time of the config that is loaded now. If the reload failed, the old
+    modification time is returned, so the next request tries again.
+    """
+    print(f'Action {action_id} requested!')
+    try:
+        log_message(f'Action {action_id} requested!')
+        if (mtime := session.config_path.stat().st_mtime) != config_mtime or _includes_changed(session):
+            print('Config file changed, reloading!')
+            session.reload()
+            config_mtime = mtime
+        session.run(action_id)
+    except ElchiError as e:
+        report_error(str(e))
+        _drop_connections(session)
+        return e.error_code, config_mtime
+    except Exception as e:
+        report_error(f'An unexpected error occurred: {e}\n Traceback: {traceback.format_exc()}')
+        _drop_connections(session)
+        return 1, config_mtime
+    else:
+        try:
+            log_message(f'Action {action_id} executed successfully!')
+        except LogWriteError as e:
+            # The action itself succeeded, so the devices stay connected
+            report_error(str(e))
+        print(f'Action {action_id} done, waiting for the next request!')
+        return 0, config_mtime
+
+
+def _valid_request(request) -> bool:
+    # Requests as sent by src.helpers.ipc, action ids are checked by the session like any other
+    if not isinstance(request, dict):
+        return False
+    if request.get('stop') is True:
+        return True
+    return isinstance(request.get('action_id'), int) and not isinstance(request['action_id'], bool)
+
+
+def _includes_changed(session: Session) -> bool:
+    actions = session.config['actions'] if session.config is not None else None
+    return isinstance(actions, IncludedActions) and actions.changed()
+
+
+def _drop_connections(session: Session) -> None:
+    # After a failure the device state is unknown, so all devices are reconnected for the next action
+    try:
+        session.close()
+    except ElchiError as e:
+        print(e)
+        log_error(str(e))
@@ -0,0 +1,118 @@
+from pathlib import Path
+from typing import Callable
+
+from src.helpers.config_cache import load_validated_config
+from src.helpers.device_pool import DevicePool
+from src.helpers.errors import ActionNotFoundError, ConfigError
+from src.helpers.execute_action import execute_action
+from src.helpers.file_load import load_config, default_config_path
+from src.helpers.logging import log_message
+from src.helpers.sweep import sweep_length
+from src.helpers.timings import timed
+from src.helpers.validate import validate_config, validate_devices, validate_action_closure
+
+
+class Session:
+    """
+    In-process access to ElchiCommander for Python scripts.
+    The config is loaded and its devices are validated once, devices are connected on first use and stay connected
+    until the session is closed. Each action (and for iterate_list the action it executes next) is validated right
+    before it is executed. Failures raise an ElchiError instead of exiting the process.
+
+        with Session() as session:
+            stable_temp = session.run(1)
+
+    :arg config_path: Path of the config file, defaults to the one in the user config directory
+    :arg interactive: Ask the user whether to retry when a device can not be connected instead of raising
+    :arg use_cache: Reuse the validated config from the config cache if the config file did not change
+    :arg look_ahead: While an iterate_list step is executed, connect the devices of the following step in the background
+    """
+
+    def __init__(self, config_path: str | Path | None = None, interactive: bool = False, use_cache: bool = True,
+                 look_ahead: bool = False):
+        self.config_path = Path(config_path) if config_path is not None else default_config_path()
+        self.interactive = interactive
+        self.use_cache = use_cache
+        self.look_ahead = look_ahead
+        self.config = None
+        self.pool = None
+        # Actions compiled by execute_action, reused by every later run until the config is reloaded
+        self.compiled_actions = {}
+        self.reload()
+
+    def reload(self) -> None:
+        """Close all devices, then load the config file with the journaled progress and validate its devices"""
+        if self.pool is not None:
+            self.pool.close_all()
+        with timed('load_config'):
+            if self.use_cache:
+                self.config = load_validated_config(self.config_path)
+            else:
+                self.config = load_config(self.config_path)
+                validate_devices(self.config)
+        self.compiled_actions = {}
+        log_message('Config loaded and validated successfully!')
+        self.pool = DevicePool(self.config['devices'], self.interactive, self.look_ahead)
+
+    def run(self, action_id: int) -> None | float:
+        """Execute an action and return its result, i.e., the stable sensor temperature for set_temp actions"""
+        with timed('validate_actions'):
+            validate_action_closure(self.config, action_id)
+        return execute_action(action_id, self.config, self.pool, self.config_path, self.compiled_actions)
+
+    def run_sequence(self, action_id: int,
+                     after_step: Callable[[int, int, None | float], None] | None = None) -> list[None | float]:
+        """
+        Execute the remaining steps of an iterate_list or sweep action one after another and return their results.
+        Devices stay connected between the steps, the progress is journaled after every step as usual, so an interrupted
+        sequence continues where it stopped.
+        :arg after_step: Called with the step number (starting at 1), the executed action id (the sweep id for sweeps)
+            and the result after every step, e.g. to trigger or wait for the external measurement
+        """
+        results = []
+        while True:
+            # Looked up before every step, an included action is parsed again when its include file changed
+            action, length = _sequence(self.config, action_id)
+            if (step := _steps_done(action)) >= length:
+                break
+            step_action_id = action['action_ids'][step] if action['type'] == 'iterate_list' else action_id
+            results.append(self.run(action_id))
+            log_message(f'Sequence step {step + 1}/{length}: action {step_action_id} executed!')
+            if after_step is not None:
+                after_step(step + 1, step_action_id, results[-1])
+        print('No more actions to process!')
+        return results
+
+    def validate(self) -> None:
+        """Validate every action in the config, not only the ones executed"""
+        validate_config(self.config)
+
+    def close(self) -> None:
+        """Close all devices"""
+        self.pool.close_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _sequence(config: dict, action_id: int) -> tuple[dict, int]:
+    """The iterate_list or sweep action with the given id and its number of steps"""
+    action = config['actions'].get(action_id)
+    if action is None:
+        raise ActionNotFoundError(f'Action with id {action_id} not found in config file!')
+    match action.get('type'):
+        case 'iterate_list':
+            return action, len(action['action_ids'])
+        case 'sweep':
+            return action, sweep_length(action)
+        case _:
+            raise ConfigError(f'Action {action_id} is not an iterate_list or sweep action!')
+
+
+def _steps_done(action: dict) -> int:
+    if action['type'] == 'iterate_list':
+        return len(action['processed_actions'])
+    return action.get('processed_steps', 0)
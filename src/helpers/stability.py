@@ -0,0 +1,247 @@
+import abc
+import math
+
+import numpy as np
+
+# PredictiveDetector keeps the readings of this many times delta_time for its fit, but at most MAX_FIT_READINGS of them
+FIT_HISTORY = 4
+MAX_FIT_READINGS = 1000
+
+
+class RingBuffer:
+    """Fixed-size buffer of the latest (time, temperature) readings, old readings are overwritten once it is full"""
+    __slots__ = ('times', 'temps', 'head', 'count')
+
+    def __init__(self, capacity: int):
+        self.times = np.empty(capacity)
+        self.temps = np.empty(capacity)
+        # Index the next reading is written to
+        self.head = 0
+        self.count = 0
+
+    def append(self, t: float, temp: float, min_spacing: float = 0) -> None:
+        """
+        Add a reading. If it was taken less than min_spacing seconds after the second newest reading, it replaces the
+        newest one instead, so that the buffer covers at least capacity * min_spacing / 2 seconds.
+        """
+        if self.count >= 2 and t - self.times[self.head - 2] < min_spacing:
+            self.head = (self.head - 1) % len(self.times)
+            self.count -= 1
+        self.times[self.head] = t
+        self.temps[self.head] = temp
+        self.head = (self.head + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+
+    def readings(self) -> tuple[np.ndarray, np.ndarray]:
+        """All readings in the buffer as arrays of times and temperatures, oldest first"""
+        if self.count < len(self.times):
+            return self.times[:self.count], self.temps[:self.count]
+        return (np.concatenate((self.times[self.head:], self.times[:self.head])),
+                np.concatenate((self.temps[self.head:], self.temps[:self.head])))
+
+
+class StabilityDetector(abc.ABC):
+    """
+    Decides from the readings of the temperature sensor whether the temperature is stable, i.e. changes by less than
+    delta_temp over delta_time seconds.
+    :arg time_res: Shortest interval between two readings
+    :arg t_set: The setpoint the temperature approaches
+    """
+    __slots__ = ('delta_time', 'delta_temp', 'time_res', 't_set')
+
+    def __init__(self, delta_time: float, delta_temp: float, time_res: float, t_set: float):
+        self.delta_time = delta_time
+        self.delta_temp = delta_temp
+        self.time_res = time_res
+        self.t_set = t_set
+
+    def capacity(self) -> int:
+        """Number of readings that have to be kept to cover delta_time"""
+        return math.ceil(self.delta_time / self.time_res) + 2
+
+    @abc.abstractmethod
+    def add(self, t: float, temp: float) -> bool:
+        """Add a reading taken at monotonic time t and return whether the temperature is stable"""
+
+    @abc.abstractmethod
+    def status(self) -> str:
+        """Progress message printed after each reading"""
+
+    def fit(self) -> dict | None:
+        """Parameters of the temperature curve fitted to the readings, for detectors that fit one"""
+        return None
+
+
+class ResetDetector(StabilityDetector):
+    """
+    Stable once no reading deviated by more than delta_temp from a reference reading for delta_time seconds.
+    A larger deviation makes that reading the new reference and restarts the countdown.
+    """
+    __slots__ = ('reference', 'since', 'remaining', 'reset')
+
+    def __init__(self, delta_time: float, delta_temp: float, time_res: float, t_set: float):
+        super().__init__(delta_time, delta_temp, time_res, t_set)
+        self.reference = None
+        self.since = None
+        self.remaining = delta_time
+        self.reset = False
+
+    def add(self, t: float, temp: float) -> bool:
+        self.reset = self.reference is not None and abs(temp - self.reference) > self.delta_temp
+        if self.reference is None or self.reset:
+            self.reference = temp
+            self.since = t
+        self.remaining = self.delta_time - (t - self.since)
+        return self.remaining <= 0
+
+    def status(self) -> str:
+        if self.reset:
+            return f'Temperature deviation larger than {self.delta_temp}! Resetting countdown!'
+        return f'Time remaining: {math.ceil(self.remaining)} seconds!'
+
+
+class WindowDetector(StabilityDetector):
+    """
+    Base class of detectors evaluating the readings of the last delta_time seconds as a whole.
+    The readings are kept in a ring buffer large enough to cover delta_time, so no reading is ever discarded too early
+    and each check is a vectorized operation over the buffer.
+    """
+    __slots__ = ('buffer', 'remaining')
+
+    def __init__(self, delta_time: float, delta_temp: float, time_res: float, t_set: float):
+        super().__init__(delta_time, delta_temp, time_res, t_set)
+        self.buffer = RingBuffer(self.capacity())
+        self.remaining = delta_time
+
+    def status(self) -> str:
+        return f'Time remaining: {math.ceil(self.remaining)} seconds!'
+
+
+class PeakToPeakDetector(WindowDetector):
+    """
+    Stable once the readings of the last delta_time seconds lie within a band of delta_temp (max - min).
+    Unlike ResetDetector, an outlier only delays the verdict until it drops out of the window, readings taken since
+    then still count.
+    """
+    __slots__ = ()
+
+    def add(self, t: float, temp: float) -> bool:
+        self.buffer.append(t, temp)
+        times, temps = self.buffer.readings()
+        # Spread of the readings from the newest back to each older one, the newest stable_count are within the band
+        newest_first = temps[::-1]
+        spread = np.maximum.accumulate(newest_first) - np.minimum.accumulate(newest_first)
+        outside = spread > self.delta_temp
+        stable_count = int(np.argmax(outside)) if outside[-1] else len(temps)
+        self.remaining = self.delta_time - (t - times[len(times) - stable_count])
+        return self.remaining <= 0
+
+
+class SlopeDetector(WindowDetector):
+    """
+    Stable once the readings cover delta_time seconds and their least-squares slope over the last delta_time seconds
+    amounts to a change of at most delta_temp over delta_time.
+    Noise around a constant temperature averages out instead of restarting the countdown.
+    """
+    __slots__ = ('drift',)
+
+    def __init__(self, delta_time: float, delta_temp: float, time_res: float, t_set: float):
+        super().__init__(delta_time, delta_temp, time_res, t_set)
+        self.drift = 0.0
+
+    def add(self, t: float, temp: float) -> bool:
+        self.buffer.append(t, temp)
+        times, temps = self.buffer.readings()
+        self.remaining = self.delta_time - (t - times[0])
+        in_window = times >= t - self.delta_time
+        times, temps = times[in_window], temps[in_window]
+        if len(times) < 2:
+            self.drift = 0.0
+        else:
+            centered = times - times.mean()
+            self.drift = float(centered @ (temps - temps.mean()) / (centered @ centered)) * self.delta_time
+        return self.remaining <= 0 and abs(self.drift) <= self.delta_temp
+
+    def status(self) -> str:
+        if self.remaining > 0:
+            return super().status()
+        return f'Temperature still drifting by {self.drift:.3g} °C over {self.delta_time} seconds!'
+
+
+class PredictiveDetector(WindowDetector):
+    """
+    Fits the readings to a first-order approach to the setpoint, T(t) = asymptote + amplitude * exp((now - t) / tau),
+    and is stable once the fitted curve changes by at most delta_temp over the next delta_time seconds.
+    For a heater settling exponentially, this is usually the case well before the readings stayed flat for delta_time.
+    The fit is only trusted once the readings cover delta_time and the fit describes them within delta_temp.
+    If the temperature started more than 2 * delta_temp away from the setpoint, it also has to have covered at least
+    half the way to it, so that a heater that did not respond yet (e.g. dead time) never counts as stable.
+    """
+    __slots__ = ('spacing', 'start_temp', 'responded', 'asymptote', 'amplitude', 'tau', 'rmse', 'drift')
+
+    def __init__(self, delta_time: float, delta_temp: float, time_res: float, t_set: float):
+        super().__init__(delta_time, delta_temp, time_res, t_set)
+        capacity = self.capacity() * FIT_HISTORY
+        self.buffer = RingBuffer(min(capacity, MAX_FIT_READINGS))
+        # If the buffer is capped, readings are thinned out so that it still covers FIT_HISTORY * delta_time
+        self.spacing = 2 * FIT_HISTORY * delta_time / MAX_FIT_READINGS if capacity > MAX_FIT_READINGS else 0
+        self.start_temp = None
+        self.responded = False
+        self.asymptote = self.amplitude = self.tau = self.rmse = self.drift = math.nan
+
+    def add(self, t: float, temp: float) -> bool:
+        if self.start_temp is None:
+            self.start_temp = temp
+        distance = self.t_set - self.start_temp
+        self.responded = (self.responded or abs(distance) <= 2 * self.delta_temp
+                          or (temp - self.start_temp) / distance >= 0.5)
+
+        self.buffer.append(t, temp, self.spacing)
+        times, temps = self.buffer.readings()
+        self.remaining = self.delta_time - (t - times[0])
+        if len(times) < 3 or self.remaining > 0:
+            return False
+        self._fit(times, temps)
+        self.drift = abs(self.amplitude) * -math.expm1(-self.delta_time / self.tau)
+        return self.responded and self.drift <= self.delta_temp and self.rmse <= self.delta_temp
+
+    def _fit(self, times: np.ndarray, temps: np.ndarray) -> None:
+        # Linear least squares of the temperatures on exp(-(t - oldest) / tau) for a log-spaced grid of time constants
+        # at once, the time constant with the smallest residual wins. The grid starts at time_res, the shortest time
+        # constant the readings can resolve, independent of how long they cover.
+        ages = times - times[0]
+        taus = np.geomspace(self.time_res, max(ages[-1], self.time_res) * 100, 64)
+        decay = np.exp(-ages / taus[:, np.newaxis])
+        decay_mean = decay.mean(axis=1)
+        decay_centered = decay - decay_mean[:, np.newaxis]
+        temps_centered = temps - temps.mean()
+        sxx = np.einsum('ij,ij->i', decay_centered, decay_centered)
+        sxy = decay_centered @ temps_centered
+        with np.errstate(divide='ignore', invalid='ignore'):
+            residuals = np.where(sxx > 0, temps_centered @ temps_centered - sxy ** 2 / sxx, np.inf)
+        best = int(np.argmin(residuals))
+        amplitude_oldest = float(sxy[best] / sxx[best]) if sxx[best] > 0 else 0.0
+        self.tau = float(taus[best])
+        self.asymptote = float(temps.mean() - amplitude_oldest * decay_mean[best])
+        # Remaining deviation from the asymptote at the newest reading
+        self.amplitude = amplitude_oldest * float(decay[best, -1])
+        self.rmse = math.sqrt(max(float(residuals[best]), 0.0) / len(temps))
+
+    def status(self) -> str:
+        if not self.responded:
+            return f'Waiting for the temperature to approach {self.t_set}!'
+        if math.isnan(self.drift):
+            return f'Collecting readings for the fit, {math.ceil(self.remaining)} seconds left!'
+        return (f'Predicted temperature {self.asymptote:.2f} °C (time constant {self.tau:.0f} s), still changing by'
+                f' {self.drift:.3g} °C over {self.delta_time} seconds!')
+
+    def fit(self) -> dict | None:
+        if math.isnan(self.drift):
+            return None
+        return {'predicted': self.asymptote, 'tau': self.tau, 'amplitude': self.amplitude, 'rmse': self.rmse}
+
+
+stability_detectors = {'reset': ResetDetector,
+                       'slope': SlopeDetector,
+                       'peak_to_peak': PeakToPeakDetector,
+                       'predictive': PredictiveDetector}
@@ -0,0 +1,102 @@
+import math
+
+from src.helpers.errors import ConfigError
+
+# Keys that identify the action or its devices, everything else may be swept
+_fixed_keys = {'type', 'heater', 'temp_sensor', 'flow_controller', 'triggerbox', 'multiplexer'}
+
+
+def sweep_length(sweep: dict) -> int:
+    """
+    Number of steps of a sweep action.
+    The axes are nested in the order given: each value of an axis is set once, followed by all steps of the axes below
+    it, just like a cycle with a subcycle in ElchiCreator.
+    """
+    axes = _axes(sweep)
+    return axis_length(axes[0]) * _block_sizes(axes)[0]
+
+
+def sweep_step(sweep: dict, step: int) -> dict:
+    """Return the action executed in the given (0-based) step of a sweep action, computed without unrolling the sweep"""
+    axes = _axes(sweep)
+    if not 0 <= step < sweep_length(sweep):
+        raise ConfigError(f'Sweep step {step} out of range, the sweep has {sweep_length(sweep)} steps!')
+    rest = step
+    for axis, block_size in zip(axes, _block_sizes(axes)):
+        index, rest = divmod(rest, block_size)
+        if rest == 0:
+            return axis_value(axis, index)
+        # The first step of each block sets the value of this axis, the others belong to the axes below
+        rest -= 1
+    raise AssertionError('Unreachable, the last block size is 1')
+
+
+def axis_length(axis: dict) -> int:
+    """
+    Number of values of a sweep axis.
+    Swept keys are given either as a list of values or as a range {start: ..., end: ..., step: ...} including the end.
+    All swept keys of an axis are changed together and must have the same number of values, an axis without swept
+    keys has a single value.
+    """
+    lengths = {key: _values_length(key, value) for key, value in axis.items() if _is_swept(key, value)}
+    if len(set(lengths.values())) > 1:
+        raise ConfigError(f'All swept entries of a sweep axis need the same number of values, got: '
+                          f'{', '.join(f'{key}: {length}' for key, length in lengths.items())}!')
+    return next(iter(lengths.values()), 1)
+
+
+def axis_value(axis: dict, index: int) -> dict:
+    """Return the action setting the index-th value of a sweep axis"""
+    return {key: _value_at(value, index) if _is_swept(key, value) else value for key, value in axis.items()}
+
+
+def axis_check_indices(axis: dict) -> range | tuple:
+    """
+    Indices of the values that have to be validated to validate a whole axis.
+    Ranges change monotonically, so their first and last value suffice, lists have to be checked completely.
+    """
+    length = axis_length(axis)
+    if any(isinstance(value, list) for key, value in axis.items() if _is_swept(key, value)):
+        return range(length)
+    return (0, length - 1) if length > 1 else (0,)
+
+
+def _axes(sweep: dict) -> list:
+    if not isinstance(axes := sweep.get('axes'), list) or not axes:
+        raise ConfigError('Missing or empty entry axes in sweep action!')
+    if not all(isinstance(axis, dict) for axis in axes):
+        raise ConfigError('Invalid entry axes in sweep action! Expected a list of actions!')
+    return axes
+
+
+def _block_sizes(axes: list) -> list:
+    # Steps needed for one value of each axis: setting the value plus all steps of the axes below it
+    sizes = [1]
+    for axis in reversed(axes[1:]):
+        sizes.append(1 + axis_length(axis) * sizes[-1])
+    return sizes[::-1]
+
+
+def _is_swept(key, value) -> bool:
+    return key not in _fixed_keys and isinstance(value, (list, dict))
+
+
+def _values_length(key, value) -> int:
+    if isinstance(value, list):
+        if not value:
+            raise ConfigError(f'Empty list of values for {key} in sweep axis!')
+        return len(value)
+    if {'start', 'end', 'step'} - value.keys():
+        raise ConfigError(f'Invalid range for {key} in sweep axis! Expected start, end and step!')
+    if not all(isinstance(value[entry], (int, float)) for entry in ('start', 'end', 'step')) or value['step'] == 0:
+        raise ConfigError(f'Invalid range for {key} in sweep axis! Start, end and step must be numbers, step not 0!')
+    # The tolerance keeps float ranges like 0.1 to 0.3 in steps of 0.1 from losing their end
+    return math.floor(abs(value['end'] - value['start']) / abs(value['step']) + 1E-9) + 1
+
+
+def _value_at(value, index: int):
+    if isinstance(value, list):
+        return value[index]
+    step = abs(value['step']) * (-1 if value['start'] > value['end'] else 1)
+    result = value['start'] + index * step
+    return result if isinstance(result, int) else round(result, 9)
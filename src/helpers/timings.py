@@ -0,0 +1,65 @@
+import json
+import time
+from contextlib import contextmanager
+
+from src.helpers.logging import log_message
+
+# Phases are recorded on the monotonic clock, relative to the start of the process (or of the last reset)
+_enabled = False
+_start = time.perf_counter()
+_records = []
+
+
+def enable_timings(start: float | None = None) -> None:
+    """Start recording phases, optionally relative to an earlier time.perf_counter() value (e.g., before imports)"""
+    global _enabled, _start
+    _enabled = True
+    if start is not None:
+        _start = start
+
+
+def reset_timings() -> None:
+    """Forget all recorded phases and measure relative to now (used between actions of a long-running process)"""
+    global _start
+    _start = time.perf_counter()
+    _records.clear()
+
+
+def record_phase(phase: str, start: float, end: float | None = None) -> None:
+    """Record a phase from two time.perf_counter() values, for phases that can not be wrapped in timed()"""
+    if _enabled:
+        end = time.perf_counter() if end is None else end
+        _records.append((phase, start - _start, end - start))
+
+
+@contextmanager
+def timed(phase: str):
+    """Record the duration of the enclosed block as the given phase, if timings are enabled"""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, start)
+
+
+def report_timings() -> None:
+    """Print a table of all recorded phases and append them as JSON to the daily log"""
+    if not _enabled:
+        return
+    phases = {}
+    for phase, offset, duration in _records:
+        first_offset, calls, total = phases.get(phase, (offset, 0, 0.0))
+        phases[phase] = (first_offset, calls + 1, total + duration)
+    wall_time = time.perf_counter() - _start
+
+    print(f'{"Phase":<30} {"Start [s]":>10} {"Calls":>6} {"Total [s]":>10}')
+    for phase, (first_offset, calls, total) in phases.items():
+        print(f'{phase:<30} {first_offset:>10.3f} {calls:>6d} {total:>10.3f}')
+    print(f'{"Wall time":<30} {"":>10} {"":>6} {wall_time:>10.3f}')
+
+    log_message('TIMINGS ' + json.dumps({'wall_time': wall_time,
+                                          'phases': {phase: {'start': first_offset, 'calls': calls, 'total': total}
+                                                     for phase, (first_offset, calls, total) in phases.items()}}))
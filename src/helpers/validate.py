@@ -1,204 +1,178 @@
-import re
+from src.helpers.devices import devices as valid_devices
+from src.helpers.errors import ConfigError
+from src.helpers.ports import available_ports, TEST_PORT
+from src.helpers.schema import check_action
+from src.helpers.sweep import axis_check_indices, axis_length, axis_value, sweep_length, sweep_step
 
-import serial.tools.list_ports
 
-from src.helpers.devices import devices as valid_devices
-from src.helpers.exit import delayed_exit
+def validate_config(config: dict) -> None:
+    """
+    Validate the devices and every action in the config (used when authoring a config with --validate).
+    All devices and actions are checked in one pass, the ConfigError raised lists every problem found.
+    """
+    if 'devices' not in config:
+        raise ConfigError('Missing devices section in config file!')
+    if 'actions' not in config:
+        raise ConfigError('Missing actions section in config file!')
 
-valid_actions = ['set_temp', 'set_temp_blind', 'gas_ctrl', 'trigger', 'multiplexer']
-available_ports = [port.device for port in serial.tools.list_ports.comports()]
-available_ports.append('COMXY')
+    errors = _device_errors(config['devices'])
+    for key, value in config['actions'].items():
+        errors.extend(_action_errors(key, value, config))
+    _raise_errors(errors)
+    print('Device config validation successful!')
+    print(f'Action config validation successful! ({len(config['actions'])} actions)')
 
 
-def validate_config(config: dict) -> None:
-    try:
-        device_config = config.get('devices')
-    except KeyError:
-        delayed_exit('Missing devices section in config file!', 1)
+def validate_changes(config: dict, changes: dict) -> None:
+    """
+    Validate a config that differs from a previously validated version by the given changes (see diff_configs):
+    Only added or changed devices are validated, and added or changed actions are checked as far as
+    validate_action_closure checks them, i.e. only the next step of list and sweep actions. The cost therefore depends
+    on the size of the changes, not of the config. All other actions, including those of include files and actions
+    using a removed device, are validated by validate_action_closure before they are executed, as for an unchanged
+    config.
+    """
+    if 'devices' not in config:
+        raise ConfigError('Missing devices section in config file!')
+    devices = config['devices']
+    changed_devices = {*changes['devices_added'], *changes['devices_changed']}
+    errors = _device_errors({key: devices[key] for key in devices if key in changed_devices})
+
+    actions = config.get('actions') if isinstance(config.get('actions'), dict) else {}
+    for key in (*changes['actions_added'], *changes['actions_changed']):
+        if key in actions:
+            errors.extend(_action_errors(key, actions[key], config, only_next=True))
+    _raise_errors(errors)
+    print('Changed config validated successfully!')
+
+
+def validate_devices(config: dict) -> None:
+    if 'devices' not in config:
+        raise ConfigError('Missing devices section in config file!')
     else:
-        _validate_device_config(device_config)
+        _raise_errors(_device_errors(config['devices']))
         print('Device config validation successful!')
 
-        try:
-            action_config = config.get('actions')
-        except KeyError:
-            delayed_exit('Missing actions section in config file!', 1)
-        else:
-            for key, value in action_config.items():
-                if not isinstance(key, int) or key < 0:
-                    delayed_exit(f'Invalid preset key encountered: {key}! Valid presets are positive integers!')
-                elif value['type'] == 'iterate_list':
-                    _validate_list_action(config, value)
-                else:
-                    _validate_action(key, value, device_config)
-            print('Action config validation successful!')
-
-
-def _validate_device_config(device_config: dict) -> None:
-    for key, config in device_config.items():
-        print(f'Validating device {key}...')
-        if missing := {'type', 'device', 'port'} - config.keys():
-            delayed_exit(f'Missing entries in config file: {missing}!', 1)
-
-        if (device_type := config['type']) not in valid_devices.keys():
-            delayed_exit(f'Invalid device type encountered: {config['type']}!\n'
-                         f' Valid device types: {', '.join(valid_devices.keys())}', 1)
-
-        if config['device'] not in valid_devices[device_type]:
-            delayed_exit(f'Invalid {device_type} device encountered: {config['device']}!\n'
-                         f' Valid device types: {', '.join(valid_devices[device_type])}', 1)
-
-        if config['port'] not in available_ports:
-            delayed_exit(f'Invalid or unavailable port encountered: {config['port']}!\n'
-                         f' Valid ports are: {', '.join(available_ports)}', 1)
-
-        print(f'Device {key} validation successful!')
-
-
-def _validate_action(key, config, device_config):
-    print(f'Validating action preset {key}...')
-    if 'type' not in config:
-        delayed_exit(f'Missing type entry in preset {key}!', 1)
-
-    match config['type']:
-        case 'set_temp':
-            print('Detected temperature set action!')
-            _validate_temp_set_action(config, device_config)
-        case 'set_temp_blind':
-            print('Detected blind temperature set action!')
-            _validate_blind_temp_set_action(config, device_config)
-        case 'gas_ctrl':
-            print('Detected gas controller action!')
-            _validate_mass_flow_action(config, device_config)
-        case 'trigger':
-            print('Detected triggerbox action!')
-            _validate_triggerbox_action(config, device_config)
-        case 'multiplexer':
-            print('Detected multiplexer action!')
-            _validate_multiplexer_action(config, device_config)
-        case 'wait':
-            print('Detected wait action!')
-            _validate_wait_action(config)
-        case _:
-            delayed_exit(f'Invalid action type encountered: {config['type']}!'
-                         f'Valid action types are: {', '.join(valid_actions)}', 1)
-
-
-def _validate_wait_action(config: dict) -> None:
-    _check_value_exists_bounds(config, 'wait_time', 1, 1E6)
-    print('Wait action validated successfully!')
-
-
-def _validate_mass_flow_action(config: dict, devices: dict) -> None:
-    _check_device_exists_and_type(config, 'flow_controller', devices)
-
-    for inner_key, inner_value in config.items():
-        if inner_key in ['flow_controller', 'type']:
-            continue
-        if not re.compile(r'^flow_[1-4]$').match(inner_key):
-            delayed_exit(f'Invalid channel encountered: {inner_key}!'
-                         f' Valid channels are: flow_1, flow_2, flow_3 and flow_4!')
-        if not isinstance(inner_value, (int, float)) or inner_value < 0 or inner_value > 100:
-            delayed_exit(f'Invalid value encountered for channel {inner_key}: {inner_value}!'
-                         f' Valid values are: 0 to 100')
-
-    print('Gas control action validated successfully!')
-
-
-def _validate_triggerbox_action(config: dict, devices: dict) -> None:
-    _check_device_exists_and_type(config, 'triggerbox', devices)
-
-    for inner_key, inner_value in config.items():
-        if inner_key in ['triggerbox', 'type']:
-            continue
-        else:
-            if not re.compile(r'^state_[1-4]$').match(inner_key):
-                delayed_exit(f'Invalid channel encountered: {inner_key}!'
-                             f' Valid channels are: state_1, state_2, state_3 and state_4!')
-            if inner_value not in [0, 1]:
-                delayed_exit(f'Invalid value encountered for channel {inner_key}: {inner_value}!'
-                             f' Valid values are: 0 or 1')
-
-    print('Triggerbox action validated successfully!')
-
-
-def _validate_multiplexer_action(config: dict, devices: dict) -> None:
-    _check_device_exists_and_type(config, 'multiplexer', devices)
-
-    for inner_key, inner_value in config.items():
-        if inner_key in ['multiplexer', 'type']:
-            continue
-        else:
-            if not re.compile(r'^state_L[1-4]R[1-4]$').match(inner_key):
-                delayed_exit(f'Invalid channel encountered: {inner_key}!'
-                             f' Valid channels are: state_LnRm, where n and m are 1 to 4!')
-            if inner_value not in [0, 1]:
-                delayed_exit(f'Invalid value encountered for channel {inner_key}: {inner_value}!'
-                             f' Valid values are: 0 or 1')
-
-    print('Multiplexer action validated successfully!')
-
-
-def _validate_temp_set_action(config: dict, devices: dict) -> None:
-    _check_device_exists_and_type(config, 'heater', devices)
-    _check_device_exists_and_type(config, 'temp_sensor', devices)
-    _check_value_exists_bounds(config, 't_set', -200, 1500)
-    _check_value_exists_bounds(config, 'delta_temp', 0.01, 100)
-    _check_value_exists_bounds(config, 'delta_time', 1, 1E6)
-    _check_value_exists_bounds(config, 'time_res', 1, 100)
-
-    print('Temperature set action validated successfully!')
-
-
-def _validate_blind_temp_set_action(config: dict, devices: dict) -> None:
-    _check_device_exists_and_type(config, 'heater', devices)
-    _check_value_exists_bounds(config, 't_set', -200, 1500)
-
-    print('Blind temperature set action validated successfully!')
-
-
-def _validate_list_action(whole_config: dict, config: dict) -> None:
+
+def validate_action_closure(config: dict, action_id: int, _visited: set | None = None) -> None:
     """
-    The list action is a meta-action that iterates over a list of actions.
-    Therefore, the validation function needs to know about the entire config.
-    :arg whole_config: The whole config
-    :arg config: The list action config
+    Validate only the actions needed to execute action_id: the action itself and, for an iterate_list action, the one
+    action it executes next. The cost is therefore independent of the number of actions in the config.
+    Devices have to be validated separately with validate_devices.
     """
-    if 'action_ids' not in config:
-        delayed_exit(f'Missing entry actions in action preset!', 1)
-    if not isinstance(config['action_ids'], list):
-        delayed_exit(f'Invalid entry actions in action preset! Expected list, got {type(whole_config["actions"])}', 1)
-    if not config['action_ids'][:len(config['processed_actions'])] == config['processed_actions']:
-        delayed_exit(f'Processed actions list does not match with beginning of action_ids list!', 1)
-    for action_id in config['action_ids']:
-        if action_id not in whole_config['actions']:
-            delayed_exit(f'Action with id {action_id} not found in config file!', 1)
+    if 'actions' not in config:
+        raise ConfigError('Missing actions section in config file!')
+    if (action := config['actions'].get(action_id)) is None:
+        # Reported as missing action when executing it
+        return
+
+    _visited = set() if _visited is None else _visited
+    if action_id in _visited:
+        raise ConfigError(f'Action {action_id} is contained in itself!')
+    _visited.add(action_id)
+
+    print(f'Validating action preset {action_id}...')
+    if action.get('type') == 'iterate_list':
+        _raise_errors(_prefixed(action_id, _list_action_errors(config, action, only_next=True)))
+        if remaining := action['action_ids'][len(action['processed_actions']):]:
+            validate_action_closure(config, remaining[0], _visited)
+    elif action.get('type') == 'sweep':
+        _raise_errors(_sweep_action_errors(action_id, action, config['devices'],
+                                           only_step=action.get('processed_steps', 0)))
+    else:
+        _raise_errors(_prefixed(action_id, check_action(action, config['devices'])))
 
-    print('List action validated successfully!')
 
+def _raise_errors(errors: list[str]) -> None:
+    if len(errors) == 1:
+        raise ConfigError(errors[0])
+    if errors:
+        raise ConfigError(f'Found {len(errors)} errors in config file:\n' + '\n'.join(errors))
 
-def _check_value_exists_bounds(config, key, min_value, max_value):
-    if key not in config:
-        delayed_exit(f'Missing entry {key} in action preset!', 1)
 
-    if not isinstance(config[key], (int, float)) or config[key] < min_value or config[key] > max_value:
-        delayed_exit(f'Invalid value encountered for {key}: {config[key]}!'
-                     f' Valid values are: {min_value} to {max_value}')
+def _prefixed(key, errors: list[str]) -> list[str]:
+    return [f'Action {key}: {error}' for error in errors]
 
 
-def _check_device_exists_and_type(action_config, device_type, device_config):
-    if device_type not in action_config:
-        delayed_exit(f'Missing entry {device_type} in action preset!', 1)
+def _action_errors(key, action, config: dict, only_next: bool = False) -> list[str]:
+    """:arg only_next: Only check the next step of list and sweep actions, see validate_action_closure"""
+    if not isinstance(key, int) or key < 0:
+        return [f'Invalid preset key encountered: {key}! Valid presets are positive integers!']
+    if not isinstance(action, dict):
+        return [f'Invalid action preset {key}! Expected a set of key, value pairs!']
+    if action.get('type') == 'iterate_list':
+        return _prefixed(key, _list_action_errors(config, action, only_next))
+    if action.get('type') == 'sweep':
+        return _sweep_action_errors(key, action, config['devices'],
+                                    only_step=action.get('processed_steps', 0) if only_next else None)
+    return _prefixed(key, check_action(action, config['devices']))
 
-    if action_config[device_type] not in device_config:
-        delayed_exit(f'Specified {device_type} {action_config[device_type]} not defined in device section!',
-                     1)
 
-    device = device_config[action_config[device_type]]
-    if device['device'] not in valid_devices[device_type]:
-        delayed_exit(f'Specified {device_type} {device} is not a valid {device_type} device!'
-                     f'Valid devices are: {', '.join(valid_devices[device_type])}',
-                     1)
+def _device_errors(device_config: dict) -> list[str]:
+    errors = []
+    for key, config in device_config.items():
+        print(f'Validating device {key}...')
+        if not isinstance(config, dict):
+            errors.append(f'Device {key}: Invalid device! Expected a set of key, value pairs!')
+        elif missing := {'type', 'device', 'port'} - config.keys():
+            errors.append(f'Device {key}: Missing entries in config file: {missing}!')
+        elif (device_type := config['type']) not in valid_devices.keys():
+            errors.append(f'Device {key}: Invalid device type encountered: {config['type']}!\n'
+                          f' Valid device types: {', '.join(valid_devices.keys())}')
+        elif config['device'] not in valid_devices[device_type]:
+            errors.append(f'Device {key}: Invalid {device_type} device encountered: {config['device']}!\n'
+                          f' Valid device types: {', '.join(valid_devices[device_type])}')
+        elif config['port'] != TEST_PORT and config['port'] not in available_ports() \
+                and config['port'] not in available_ports(refresh=True):
+            errors.append(f'Device {key}: Invalid or unavailable port encountered: {config['port']}!\n'
+                          f' Valid ports are: {', '.join((*available_ports(), TEST_PORT))}')
+    return errors
+
+
+def _list_action_errors(whole_config: dict, config: dict, only_next: bool = False) -> list[str]:
+    """
+    The list action is a meta-action that iterates over a list of actions.
+    Therefore, the validation function needs to know about the entire config.
+    :arg whole_config: The whole config
+    :arg config: The list action config
+    :arg only_next: Only check that the next action to be executed exists instead of all listed actions
+    """
+    if 'action_ids' not in config:
+        return ['Missing entry action_ids in action preset!']
+    if not isinstance(config['action_ids'], list):
+        return [f'Invalid entry action_ids in action preset! Expected list, got {type(config['action_ids'])}']
+    processed = config.get('processed_actions', [])
+    if not config['action_ids'][:len(processed)] == processed:
+        return ['Processed actions list does not match with beginning of action_ids list! If the list was '
+                'changed, delete the progress file next to the config file to start it over.']
+    action_ids = config['action_ids'][len(processed):][:1] if only_next else config['action_ids']
+    actions = whole_config['actions']
+    return [f'Action with id {action_id} not found in config file!' for action_id in action_ids
+            if action_id not in actions]
+
+
+def _sweep_action_errors(key, config: dict, device_config: dict, only_step: int | None = None) -> list[str]:
+    """
+    A sweep action computes its steps from its axes, see src/helpers/sweep.py.
+    :arg only_step: Only validate the action of this step instead of all values of all axes
+    """
+    try:
+        length = sweep_length(config)
+        for number, axis in enumerate(config['axes'], start=1):
+            if axis.get('type') in ('iterate_list', 'sweep'):
+                return [f'Action {key}: Invalid action type in axis {number} of sweep: {axis['type']}!']
+            axis_length(axis)
+    except ConfigError as e:
+        return [f'Action {key}: {e}']
+
+    if only_step is not None:
+        if only_step < length:
+            step_action = sweep_step(config, only_step)
+            return _prefixed(f'{key} (step {only_step + 1})', check_action(step_action, device_config))
+        return []
+    return [error for number, axis in enumerate(config['axes'], start=1) for index in axis_check_indices(axis)
+            for error in _prefixed(f'{key} (axis {number}, value {index + 1})',
+                                   check_action(axis_value(axis, index), device_config))]
 
 
 if __name__ == '__main__':